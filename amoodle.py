@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:12:03 2026
+
+Asynchronous counterpart of moodle.Moodle. All pages are fetched over one
+aiohttp session, so many courses can be scraped from a single event loop:
+
+    async with AsyncMoodle(acc) as moodle:
+        facs = await moodle.getAllFacilities()
+        subFacs = await asyncio.gather(*map(moodle.getAllSubFacilites, facs))
+
+The html is parsed by the same parse* functions as the blocking client.
+
+@author: ctoffer
+"""
+
+import asyncio
+import aiohttp
+
+from moodle import MoodleAccount, MoodleFacility, MoodleSubFacility, MoodleCourse
+from moodle import MOODLE_URL
+from moodle import parseSesskey, parseSemesters, parseFacilities
+from moodle import parseSubFacilities, parseCourses
+from moodle import parseSheetLink, parseSubmissionsLink, parseFilterForm
+from moodle import parseSubmissions
+
+#==============================================================================
+
+class AsyncMoodle:
+
+    __baseURL = MOODLE_URL
+
+    def __init__(self, acc : MoodleAccount, maxRequests = 8):
+        self.__acc = acc
+        self.__session = None
+        self.__sesskey = None
+        self.__limit = asyncio.Semaphore(maxRequests)
+
+    #--------------------------------------------------------------------------
+
+    async def login (self):
+        self.__session = aiohttp.ClientSession()
+        website = AsyncMoodle.__baseURL + "/login/index.php"
+        print('login', website)
+
+        data = dict(username = self.__acc.username, password = self.__acc.password)
+        async with self.__session.post(website, data = data) as r:
+            url, status = str(r.url), r.status
+
+        if url == website or status != 200:
+            await self.__session.close()
+            raise RuntimeError('Login failed! - Check ur internet connection, username and password')
+
+        self.__sesskey = parseSesskey(await self.__fetch('GET', url))
+
+    async def logout (self):
+        print('AsyncMoodle - logout()')
+
+        website = AsyncMoodle.__baseURL + '/login/logout.php?sesskey=%s' % self.__sesskey
+        async with self.__session.post(website) as r:
+            status = r.status
+
+        await self.__session.close()
+        self.__session = None
+        self.__sesskey = None
+
+        if status != 200:
+            raise RuntimeError('Logout Failed - Session was closed!')
+
+    #--------------------------------------------------------------------------
+
+    async def __aenter__ (self):
+        await self.login()
+        return self
+
+    async def __aexit__ (self, type, value, traceback):
+        await self.logout()
+
+    #--------------------------------------------------------------------------
+
+    async def __fetch(self, method, url, data = None):
+        async with self.__limit:
+            async with self.__session.request(method, url, data = data) as r:
+                return await r.text()
+
+    #--------------------------------------------------------------------------
+
+    async def listSemesters(self):
+        legacy = AsyncMoodle.__baseURL + '/course/index.php'
+        return parseSemesters(await self.__fetch('POST', legacy))
+
+    async def getAllFacilities(self, semesterURL = None):
+        html = await self.__fetch('POST', semesterURL or AsyncMoodle.__baseURL)
+        return parseFacilities(html)
+
+    async def getAllSubFacilites(self, fac : MoodleFacility):
+        return parseSubFacilities(fac, await self.__fetch('GET', fac.url))
+
+    async def getAllCourses(self, sFac : MoodleSubFacility):
+        return parseCourses(sFac, await self.__fetch('GET', sFac.url))
+
+    async def getAllSubmissions(self, course : MoodleCourse, sheetNr, filt = None):
+        sheetLink = parseSheetLink(await self.__fetch('GET', course.url), sheetNr)
+        url = parseSubmissionsLink(await self.__fetch('GET', sheetLink))
+
+        formData = parseFilterForm(await self.__fetch('GET', url), self.__sesskey)
+        await self.__fetch('POST', url, data = formData)
+
+        data = parseSubmissions(await self.__fetch('GET', url))
+        print('Found a total of %i submissions in %s' % (len(data), course.name))
+
+        return data if filt is None else filt.filterList(data)
+
+#==============================================================================
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:40:51 2026
+
+Asynchronous counterpart of muesli.Muesli. The tutorial pages and the
+student tables are fetched concurrently over one aiohttp session:
+
+    async with AsyncMuesli(acc) as muesli:
+        tuts = await muesli.getAllTutorials()
+        students = await muesli.getAllStudents(tuts)
+
+The html is parsed by the same parse* functions as the blocking client.
+
+@author: ctoffer
+"""
+
+import asyncio
+import aiohttp
+
+from muesli import MuesliAcc, Tutorial
+from muesli import parseTutorialLinks, parseTutorialInfo, parseStudents
+
+#==============================================================================
+
+class AsyncMuesli:
+
+    def __init__ (self, acc : MuesliAcc, maxRequests = 8):
+        self.__acc = acc
+        self.baseURL = 'https://muesli.mathi.uni-heidelberg.de'
+        self.session = None
+        self.curURL = None
+        self.__limit = asyncio.Semaphore(maxRequests)
+
+    #--------------------------------------------------------------------------
+
+    async def login (self):
+        print('MÜSLI - login()')
+        self.session = aiohttp.ClientSession()
+        website = self.baseURL + "/user/login"
+
+        data = dict(email = self.__acc.mail, password = self.__acc.passw)
+        async with self.session.post(website, data = data) as r:
+            url, status = str(r.url), r.status
+
+        if url == website or status != 200:
+            await self.session.close()
+            raise RuntimeError('Login failed! - Check ur internet connection, username and password')
+        self.curURL = url
+
+    async def logout (self):
+        print('MÜSLI - logout')
+        website = self.baseURL + '/user/logout'
+        resultWeb = self.baseURL + '/'
+
+        async with self.session.post(website) as r:
+            url, status = str(r.url), r.status
+        await self.session.close()
+        self.session = None
+
+        if url != resultWeb or status != 200:
+            raise RuntimeError('Logout Failed - Session was closed!')
+
+    #--------------------------------------------------------------------------
+
+    async def __aenter__ (self):
+        await self.login()
+        return self
+
+    async def __aexit__ (self, type, value, traceback):
+        await self.logout()
+
+    #--------------------------------------------------------------------------
+
+    async def __post(self, url):
+        async with self.__limit:
+            async with self.session.post(url) as r:
+                return await r.text()
+
+    async def __extractTutorialInfo (self, tutoralLink):
+        return parseTutorialInfo(tutoralLink, await self.__post(tutoralLink))
+
+    async def getAllTutorials(self, show_all = False):
+        startURL = self.baseURL + '/start'
+        if show_all:
+            startURL += '?show_all=1'
+
+        links = parseTutorialLinks(self.baseURL, await self.__post(startURL))
+        return list(await asyncio.gather(*map(self.__extractTutorialInfo, links)))
+
+    #--------------------------------------------------------------------------
+
+    async def getAllStudents(self, tut):
+        if isinstance(tut, list):
+            res = []
+            for students in await asyncio.gather(*map(self.getAllStudents, tut)):
+                res.extend(students)
+            return res
+
+        elif isinstance(tut, Tutorial):
+            return parseStudents(tut, await self.__post(tut.url))
+
+        else:
+            raise RuntimeError("Need a 'list of Tutorials' or a 'Tutorial'")
+
+#==============================================================================
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:42:09 2026
+
+Benchmarks for the tutorial helper. Run them from the repository root:
+
+    python -m bench.parsers     - html parser backends
+    python -m bench.e2e         - whole pipeline against bench.simulator
+    python -m bench.micro       - name matching, file names, Cipher, DataTable
+    python -m bench.startup     - startup time of the entry points
+
+@author: ctoffer
+"""
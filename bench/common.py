@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:44:30 2026
+
+Helpers shared by the benchmarks.
+
+@author: ctoffer
+"""
+
+import sys
+
+from time import perf_counter
+
+from util import DataTable
+
+#==============================================================================
+
+def measure(fn, repeat = 5, number = 1):
+    """
+        Calls fn number times per round for repeat rounds.
+        Returns (best, mean) seconds per call.
+    """
+    rounds = []
+    for _ in range(repeat):
+        start = perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((perf_counter() - start) / number)
+
+    return (min(rounds), sum(rounds) / len(rounds))
+
+def printTable(header, rows, stream = sys.stdout):
+    """ rows are dicts, all values are converted to str """
+    toStr = lambda row : {k : str(row.get(k, '')) for k in header}
+    DataTable(header, rows, to_dict = toStr).printToStream(stream = stream)
+
+#==============================================================================
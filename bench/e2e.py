@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:31:15 2026
+
+Runs the whole pipeline of mdc.py and sbm_dload.py against the local
+simulator and reports wall time, requests and peak memory per stage.
+
+    python -m bench.e2e [--submissions N [N ...]] [--latency MS]
+                        [--workers W] [--archive-kib K] [--no-memory]
+
+Stages: roster (MÜSLI login, tutorials, students), navigate (Moodle login,
+semester, facility, subfacility and course like mdc.py), download (Moodle
+login, grading table, archives), correct, manifest and unpack. Peak memory is
+measured with tracemalloc and only covers this process, not the unpack
+workers; --no-memory skips it, tracemalloc slows the stages down.
+
+@author: ctoffer
+"""
+
+import argparse
+import json
+import sys
+import tracemalloc
+
+from contextlib import redirect_stdout
+from os import devnull
+from os import makedirs as o_mkdirs
+from os.path import join as p_join
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from folder import SubmissionFolder
+from moodle import Moodle, MoodleAccount
+from muesli import Muesli, MuesliAcc
+from student import Student
+from util import DataTable
+
+from bench.common import printTable
+from bench.simulator import Simulator, tutorLastname
+
+#==============================================================================
+
+SHEET = 1
+HEADER = ['Submissions', 'Stage', 'Seconds', 'Requests', 'Peak MiB']
+
+#------------------------------------------------------------------------------
+
+class Stages:
+
+    """ Measures the stages of one run, see measure """
+    def __init__(self, sim, submissions, memory = True, verbose = False):
+        self.__sim = sim
+        self.__submissions = submissions
+        self.__memory = memory
+        self.__verbose = verbose
+        self.rows = []
+
+    def measure(self, name, fn):
+        requests = self.__sim.requests
+        if self.__memory:
+            tracemalloc.start()
+
+        start = perf_counter()
+        with open(devnull, 'w') as sink:
+            with redirect_stdout(sys.stdout if self.__verbose else sink):
+                result = fn()
+        seconds = perf_counter() - start
+
+        peak = None
+        if self.__memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        row = dict()
+        row['Submissions'] = self.__submissions
+        row['Stage'] = name
+        row['Seconds'] = '%.2f' % seconds
+        row['Requests'] = self.__sim.requests - requests
+        row['Peak MiB'] = '' if peak is None else '%.1f' % (peak / 2 ** 20)
+        self.rows.append(row)
+        return result
+
+#------------------------------------------------------------------------------
+
+def navigate(moodle):
+    """ The first choice on every level of mdc.navigateMoodle """
+    semesterURL = moodle.listSemesters()[0][1]
+    fac = moodle.getAllFacilities(semesterURL = semesterURL)[0]
+    subFac = moodle.getAllSubFacilites(fac)[0]
+    return moodle.getAllCourses(subFac)[0]
+
+def writeMetaData(root, sim, tuts, students, course):
+    mdataPath = p_join(root, 'MetaData')
+    o_mkdirs(mdataPath, exist_ok = True)
+
+    cols = ["Subject", "Day", "Time", "Tutor", "Room", "State", "URL"]
+    DataTable.writeToFile(p_join(mdataPath, 'tutorials.table'), cols, tuts, to_dict = lambda tut : tut.toDict())
+    DataTable.writeToFile(p_join(mdataPath, 'students.table'), Student.keys(), students, to_dict = Student.to_dict)
+
+    with open(p_join(mdataPath, 'course.json'), 'w', encoding = 'utf-8') as fp:
+        json.dump(course.toDict(), fp, indent = 4)
+    with open(p_join(mdataPath, 'tutordata.json'), 'w', encoding = 'utf-8') as fp:
+        json.dump({'Firstname' : 'Max', 'Lastname' : tutorLastname(sim.config)}, fp, indent = 4)
+
+def run(submissions, latency, workers, archiveKiB, memory = True, verbose = False):
+    with Simulator(submissions = submissions, latency = latency, archiveKiB = archiveKiB) as sim:
+        with TemporaryDirectory() as root:
+            stages = Stages(sim, submissions, memory, verbose)
+
+            def roster():
+                with Muesli(MuesliAcc('tutor', 'secret'), baseURL = sim.muesliURL) as muesli:
+                    tuts = muesli.getAllTutorials(workers = workers)
+                    return tuts, muesli.getAllStudents(tuts, workers = workers)
+
+            tuts, students = stages.measure('roster', roster)
+
+            def course():
+                with Moodle(MoodleAccount('tutor', 'secret'), baseURL = sim.moodleURL) as moodle:
+                    return navigate(moodle)
+
+            writeMetaData(root, sim, tuts, students, stages.measure('navigate', course))
+            folder = SubmissionFolder(root, SHEET)
+
+            def download():
+                with Moodle(MoodleAccount('tutor', 'secret'), baseURL = sim.moodleURL) as moodle:
+                    return folder.downloadSubsIntoOrigin(moodle, workers = workers, stream = True)
+
+            osubms = stages.measure('download', download)
+            lsubms = stages.measure('correct', lambda : folder.correctOrigin(osubms))
+            stages.measure('manifest', lambda : folder.buildManifest(lsubms, workers = workers))
+            stages.measure('unpack', lambda : folder.unpackIntoWorking(lsubms, workers = workers))
+
+    return stages.rows
+
+#==============================================================================
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'End-to-end benchmark against the local simulator')
+    parser.add_argument('--submissions', type = int, nargs = '+', default = [50, 1000])
+    parser.add_argument('--latency', type = float, default = 0, help = 'milliseconds per request')
+    parser.add_argument('--workers', type = int, default = 8)
+    parser.add_argument('--archive-kib', type = int, default = 64)
+    parser.add_argument('--no-memory', action = 'store_true', help = 'skip the tracemalloc peak')
+    parser.add_argument('--verbose', action = 'store_true', help = 'show the output of the stages')
+    args = parser.parse_args()
+
+    rows = []
+    for n in args.submissions:
+        rows += run(n, args.latency / 1000, args.workers, args.archive_kib
+                    , memory = not args.no_memory, verbose = args.verbose)
+
+    printTable(HEADER, rows)
+
+#==============================================================================
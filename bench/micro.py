@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:04:52 2026
+
+Micro-benchmarks of the pure Python hot paths: name matching, file name
+correction, the Cipher and DataTable.
+
+    python -m bench.micro [--sizes N [N ...]] [--repeat R] [--only CASE]
+                          [--save FILE] [--compare FILE]
+
+Every case runs on a synthetic roster of N students (umlauts, double
+names) and N submission file names in the styles of synthetic.fileNames.
+Ops/s counts the items of one call, Peak KiB is the tracemalloc peak of
+one call. --save stores the ops/s as a baseline, --compare prints the
+ratio to a stored baseline (> 1 is faster).
+
+@author: ctoffer
+"""
+
+import argparse
+import json
+import tracemalloc
+
+from contextlib import redirect_stdout
+from io import StringIO
+from os import devnull
+from random import Random
+
+from folder import LocalSubmission, SubmissionSyntaxCorrector, checkParenExpr, extractStudentNamesFromPath
+from moodle import MoodleSubmission
+from student import NameComparator, StudentFilter, Student, escapeName
+from util import Cipher, DataTable
+
+from bench import synthetic
+from bench.common import measure, printTable
+
+#==============================================================================
+
+HEADER = ['Case', 'N', 'Best ms', 'Ops/s', 'Peak KiB', 'vs Base']
+TUTOR = 'Tutor'
+
+#------------------------------------------------------------------------------
+
+def submissionsOf(students, names):
+    return [LocalSubmission(MoodleSubmission(stud.name, stud.mail, 'Abgegeben', '', '', fname), fname) \
+            for stud, fname in zip(students, names)]
+
+def cases(n, seed = 0):
+    """ [(name, items per call, fn)] on a roster of n students """
+    rnd = Random(seed)
+    students = synthetic.roster(n, seed = seed)
+    others = synthetic.roster(n, seed = seed + 1)
+    names = synthetic.fileNames(students, TUTOR, seed = seed)
+
+    comparator = NameComparator()
+    pairs = [(rnd.choice(students).name, rnd.choice(students).name) for _ in range(n)]
+
+    fil = StudentFilter(students)
+    # half of the submissions come from the roster, the other half not
+    subms = [lsubm.subm for lsubm in submissionsOf(students[::2] + others[1::2], names)]
+
+    ssc = SubmissionSyntaxCorrector(TUTOR, 1)
+    lsubms = submissionsOf(students, names)
+    wrong = [name for name in names if not ssc.isCorrect(name)]
+
+    mails = [stud.mail for stud in students]
+    cipher = Cipher('key_moodle')
+    encoded = [cipher.encode(mail) for mail in mails]
+
+    table = StringIO()
+    DataTable(Student.keys(), students, to_dict = Student.to_dict).printToStream(stream = table)
+    table = table.getvalue()
+
+    def compareNames():
+        # escapeName is cached, start cold like a fresh run
+        escapeName.cache_clear()
+        for left, right in pairs:
+            comparator(left, right)
+
+    def writeTable():
+        DataTable(Student.keys(), students, to_dict = Student.to_dict).printToStream(stream = StringIO())
+
+    return [('NameComparator', n, compareNames)
+            , ('StudentFilter.__init__', n, lambda : StudentFilter(students))
+            , ('StudentFilter.filterList', n, lambda : fil.filterList(subms))
+            , ('filterPaths', n, lambda : ssc.filterPaths(lsubms))
+            , ('autocorrect', len(wrong), lambda : [ssc.autocorrect(name, fil.findAll) for name in wrong])
+            , ('checkParenExpr', n, lambda : [checkParenExpr(name) for name in names])
+            , ('extractStudentNamesFromPath', n, lambda : [extractStudentNamesFromPath(name) for name in names])
+            , ('Cipher.encode', n, lambda : [cipher.encode(mail) for mail in mails])
+            , ('Cipher.decode', n, lambda : [cipher.decode(mail) for mail in encoded])
+            , ('DataTable write', n, writeTable)
+            , ('DataTable read', n, lambda : DataTable.readFromString(table, Student.fromDict))]
+
+#------------------------------------------------------------------------------
+
+def peakOf(fn):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def run(sizes, repeat, only = None, baseline = None):
+    rows, results = [], dict()
+
+    for n in sizes:
+        for name, items, fn in cases(n):
+            if only is not None and only not in name:
+                continue
+
+            # filterList prints, keep the table readable
+            with open(devnull, 'w') as sink, redirect_stdout(sink):
+                best, _ = measure(fn, repeat = repeat)
+                peak = peakOf(fn)
+
+            key = '%s@%i' % (name, n)
+            ops = items / max(best, 1e-9)
+            results[key] = ops
+
+            row = dict()
+            row['Case'] = name
+            row['N'] = n
+            row['Best ms'] = '%.2f' % (best * 1000)
+            row['Ops/s'] = '%.0f' % ops
+            row['Peak KiB'] = '%.0f' % (peak / 1024)
+            row['vs Base'] = '%.2f' % (ops / baseline[key]) if baseline and key in baseline else ''
+            rows.append(row)
+
+    return rows, results
+
+#==============================================================================
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Micro-benchmarks of the pure Python hot paths')
+    parser.add_argument('--sizes', type = int, nargs = '+', default = [100, 1000, 10000])
+    parser.add_argument('--repeat', type = int, default = 3)
+    parser.add_argument('--only', help = 'run the cases containing this text')
+    parser.add_argument('--save', help = 'store the ops/s as baseline in this file')
+    parser.add_argument('--compare', help = 'baseline file to compare against')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding = 'utf-8') as fp:
+            baseline = json.load(fp)
+
+    rows, results = run(args.sizes, args.repeat, args.only, baseline)
+    printTable(HEADER, rows)
+
+    if args.save:
+        with open(args.save, 'w', encoding = 'utf-8') as fp:
+            json.dump(results, fp, indent = 4, sort_keys = True)
+        print('Saved baseline to', args.save)
+
+#==============================================================================
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:20:37 2026
+
+Compares the html parser backends on the scraper functions.
+
+    python -m bench.parsers [--pages DIR] [--rows N] [--repeat R]
+
+Saved pages in DIR are picked by their file name prefix:
+    grading*.html     - parseSubmissions
+    categories*.html  - parseFacilities
+    subcategory*.html - parseSubFacilities
+    courses*.html     - parseCourses
+    start*.html       - parseTutorialLinks
+    tutorial*.html    - parseTutorialInfo and parseStudents
+Without DIR synthetic pages are generated. Every backend has to produce
+the same objects as 'html.parser', otherwise the row is marked.
+
+@author: ctoffer
+"""
+
+import argparse
+
+from os import listdir as o_listdir
+from os.path import join as p_join
+
+import htmlparse
+import moodle
+import muesli
+
+from bench import synthetic
+from bench.common import measure, printTable
+
+#==============================================================================
+
+FAC = moodle.MoodleFacility('1', 'Facility', synthetic.MOODLE + '/course/index.php?categoryid=1')
+SUBFAC = moodle.MoodleSubFacility(FAC, '2', 'SubFacility', synthetic.MOODLE + '/course/index.php?categoryid=2')
+TUT = muesli.Tutorial(synthetic.SUBJECT, 'Montag', '16:00', tutor = 'Max Tutor')
+
+PARSERS = [('grading', 'parseSubmissions', moodle.parseSubmissions)
+           , ('categories', 'parseFacilities', moodle.parseFacilities)
+           , ('subcategory', 'parseSubFacilities', lambda html : moodle.parseSubFacilities(FAC, html))
+           , ('courses', 'parseCourses', lambda html : moodle.parseCourses(SUBFAC, html))
+           , ('start', 'parseTutorialLinks', lambda html : muesli.parseTutorialLinks('', html))
+           , ('tutorial', 'parseTutorialInfo', lambda html : muesli.parseTutorialInfo('', html))
+           , ('tutorial', 'parseStudents', lambda html : muesli.parseStudents(TUT, html))]
+
+#------------------------------------------------------------------------------
+
+def syntheticPages(rows):
+    students = synthetic.roster(rows)
+    fileURL = lambda i, name : (synthetic.MOODLE + '/pluginfile.php/%i/a.zip' % i, 'a.zip')
+
+    pages = []
+    pages.append(('grading', synthetic.gradingPage([s.name for s in students], fileURL)))
+    pages.append(('categories', synthetic.categoryPage(range(rows // 10 + 1))))
+    pages.append(('subcategory', synthetic.categoryPage(range(rows // 10 + 1))))
+    pages.append(('courses', synthetic.coursesPage(range(rows // 10 + 1))))
+    pages.append(('start', synthetic.startPage(range(rows // 10 + 1))))
+    pages.append(('tutorial', synthetic.tutorialPage(students)))
+    return pages
+
+def savedPages(path):
+    pages = []
+    for fname in sorted(o_listdir(path)):
+        with open(p_join(path, fname), 'r', encoding = 'utf-8') as fp:
+            pages.append((fname, fp.read()))
+    return pages
+
+def comparable(result):
+    toPlain = lambda x : x.toDict() if hasattr(x, 'toDict') else x
+    return [toPlain(x) for x in result] if isinstance(result, list) else toPlain(result)
+
+#------------------------------------------------------------------------------
+
+def run(pages, repeat):
+    rows = []
+
+    for fname, html in pages:
+        for prefix, name, parse in PARSERS:
+            if not fname.startswith(prefix):
+                continue
+
+            htmlparse.setBackend('html.parser')
+            reference = comparable(parse(html))
+
+            for backend in htmlparse.availableBackends():
+                htmlparse.setBackend(backend)
+                same = comparable(parse(html)) == reference
+                best, mean = measure(lambda : parse(html), repeat = repeat)
+
+                row = dict()
+                row['Page'] = fname
+                row['Function'] = name
+                row['Backend'] = backend
+                row['KiB'] = '%i' % (len(html.encode('utf-8')) // 1024)
+                row['Best ms'] = '%.2f' % (best * 1000)
+                row['Mean ms'] = '%.2f' % (mean * 1000)
+                row['Identical'] = 'yes' if same else 'NO'
+                rows.append(row)
+
+    return rows
+
+#==============================================================================
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Compare the html parser backends')
+    parser.add_argument('--pages', help = 'directory with saved pages')
+    parser.add_argument('--rows', type = int, default = 1000, help = 'size of the synthetic pages')
+    parser.add_argument('--repeat', type = int, default = 5)
+    args = parser.parse_args()
+
+    pages = savedPages(args.pages) if args.pages else syntheticPages(args.rows)
+    header = ['Page', 'Function', 'Backend', 'KiB', 'Best ms', 'Mean ms', 'Identical']
+    printTable(header, run(pages, args.repeat))
+
+#==============================================================================
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:58:44 2026
+
+A local stand-in for Moodle and MÜSLI. It serves the login, category,
+course, assignment and grading pages, generated archives and the MÜSLI
+start and tutorial pages for a synthetic roster, optionally with an
+artificial latency per request. The server runs in its own process, so
+it does not compete with the measured client for the GIL.
+
+    python -m bench.simulator [--port P] [--submissions N] [--latency MS]
+
+Moodle lives under <url>/moodle, MÜSLI under <url>/muesli. Every student
+of the roster has a correctly named submission for every sheet, see
+archiveName. The categories form a single path: the semester list leads
+to SEMESTER, SEMESTER and the front page list FACILITY, FACILITY lists
+SUBFACILITY and SUBFACILITY holds the one course COURSE.
+
+@author: ctoffer
+"""
+
+import argparse
+import multiprocessing
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from random import Random
+from time import sleep
+from urllib.parse import urlsplit, parse_qs, quote, unquote
+from zipfile import ZipFile, ZIP_STORED
+
+from bench import synthetic
+
+#==============================================================================
+
+DEFAULTS = {'submissions' : 50
+            , 'tutorials' : 4
+            , 'sheets' : 1
+            , 'archiveKiB' : 64
+            , 'latency' : 0.0       # seconds per request
+            , 'tutor' : 'Max Tutor'
+            , 'seed' : 0}
+
+SESSKEY = 's3ssk3y'
+
+# category ids, the course id
+SEMESTER, FACILITY, SUBFACILITY, COURSE = 3, 1, 2, 1
+
+#------------------------------------------------------------------------------
+
+def tutorLastname(config):
+    return config['tutor'].split(' ')[-1]
+
+def archiveName(config, sheetNr, name):
+    """ The file name SubmissionSyntaxCorrector accepts without changes """
+    return '%s_Blatt%s_%s.zip' % (tutorLastname(config).upper(), str(sheetNr).zfill(2), name.replace(' ', '-'))
+
+def rosterOf(config):
+    return synthetic.roster(config['submissions'], config['tutorials'], config['seed']
+                            , config['tutor'], distinct = True)
+
+#==============================================================================
+
+class Site:
+
+    """ The pages of one simulated semester, generated once """
+    def __init__(self, config, baseURL):
+        self.config = config
+        self.moodle = baseURL + '/moodle'
+        self.muesli = baseURL + '/muesli'
+        self.students = rosterOf(config)
+        size = config['archiveKiB'] * 1024
+        self.payload = Random(config['seed']).getrandbits(8 * size).to_bytes(size, 'little') if size > 0 else b''
+        self.grading = dict()
+
+    def categoryPage(self, iD):
+        if iD == SEMESTER:
+            return synthetic.categoryPage([FACILITY], baseURL = self.moodle)
+        if iD == FACILITY:
+            return synthetic.categoryPage([SUBFACILITY], baseURL = self.moodle)
+        if iD == SUBFACILITY:
+            return synthetic.coursesPage([COURSE], baseURL = self.moodle)
+        return None
+
+    def assignURL(self, sheetNr):
+        return self.moodle + '/mod/assign/view.php?id=%i' % sheetNr
+
+    def gradingPage(self, sheetNr):
+        if sheetNr not in self.grading:
+            def fileURL(i, name):
+                fname = archiveName(self.config, sheetNr, name)
+                return (self.moodle + '/pluginfile.php/%i/%i/%s' % (sheetNr, i, quote(fname)), fname)
+
+            names = [stud.name for stud in self.students]
+            self.grading[sheetNr] = synthetic.gradingPage(names, fileURL, cmId = sheetNr, baseURL = self.moodle)
+        return self.grading[sheetNr]
+
+    def archive(self, i):
+        # the payload is shared, the name makes every archive unique
+        stud = self.students[i]
+        buffer = BytesIO()
+        with ZipFile(buffer, 'w', ZIP_STORED) as z:
+            z.writestr('loesung/name.txt', stud.name)
+            z.writestr('loesung/payload.bin', self.payload)
+        return buffer.getvalue()
+
+    def tutorialPage(self, t):
+        short, day, time = synthetic.slot(t)
+        students = [stud for stud in self.students if stud.day == day and stud.time == time]
+        return synthetic.tutorialPage(students, short, time, self.config['tutor'])
+
+#==============================================================================
+
+class Handler(BaseHTTPRequestHandler):
+
+    site = None
+    counter = None
+
+    def log_message(self, format, *args):
+        pass
+
+    #--------------------------------------------------------------------------
+
+    def __send(self, status, body = b'', headers = ()):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        for key, value in headers:
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def __redirect(self, path, cookie = None):
+        headers = [('Location', path)]
+        if cookie is not None:
+            headers.append(('Set-Cookie', cookie + '=sim; Path=/'))
+        self.__send(303, headers = headers)
+
+    def __loggedIn(self, cookie):
+        return cookie in (self.headers.get('Cookie') or '')
+
+    def __file(self, i):
+        data = self.site.archive(i)
+        offset = 0
+        rng = self.headers.get('Range')
+        if rng is not None and rng.startswith('bytes='):
+            offset = int(rng[len('bytes='):].split('-')[0])
+            if offset >= len(data):
+                return self.__send(416, headers = [('Content-Range', 'bytes */%i' % len(data))])
+            return self.__send(206, data[offset:], [('Content-Range', 'bytes %i-%i/%i' % (offset, len(data) - 1, len(data)))])
+        self.__send(200, data, [('Content-Type', 'application/zip')])
+
+    #--------------------------------------------------------------------------
+
+    def __moodle(self, method, path, query):
+        site = self.site
+        if path == '/login/index.php' and method == 'POST':
+            return self.__redirect('/moodle/my/', cookie = 'MoodleSession')
+        if path == '/my/':
+            return self.__send(200, '<html><head><script>M.cfg = {"wwwroot":"%s","sesskey":"%s"};</script></head>'
+                                    '<body>Dashboard</body></html>' % (site.moodle, SESSKEY))
+        if path == '/user/profile.php':
+            if self.__loggedIn('MoodleSession'):
+                return self.__send(200, '<html><body>Profil</body></html>')
+            return self.__redirect('/moodle/login/index.php')
+        if path == '/login/logout.php':
+            return self.__send(200, '<html><body>Logged out</body></html>')
+        if path in ('', '/'):
+            return self.__send(200, synthetic.categoryPage([FACILITY], baseURL = site.moodle))
+        if path == '/course/index.php':
+            if 'categoryid' not in query:
+                return self.__send(200, synthetic.categoryPage([SEMESTER], baseURL = site.moodle))
+            page = site.categoryPage(int(query['categoryid'][0]))
+            if page is not None:
+                return self.__send(200, page)
+        if path == '/course/view.php':
+            sheets = range(1, site.config['sheets'] + 1)
+            return self.__send(200, synthetic.coursePage(sheets, site.assignURL, baseURL = site.moodle))
+        if path == '/mod/assign/view.php':
+            sheetNr = int(query['id'][0])
+            if query.get('action') == ['grading']:
+                if method == 'POST':
+                    return self.__send(200, '<html><body>Saved</body></html>')
+                return self.__send(200, site.gradingPage(sheetNr))
+            return self.__send(200, synthetic.assignPage(site.assignURL(sheetNr) + '&action=grading'))
+        if path.startswith('/pluginfile.php/'):
+            return self.__file(int(path.split('/')[3]))
+        self.__send(404, 'Not found')
+
+    def __muesli(self, method, path, query):
+        site = self.site
+        if path == '/user/login' and method == 'POST':
+            return self.__redirect('/muesli/start', cookie = 'MuesliSession')
+        if path == '/user/logout':
+            return self.__redirect('/muesli/')
+        if path == '/':
+            return self.__send(200, '<html><body>MÜSLI</body></html>')
+        if not self.__loggedIn('MuesliSession'):
+            return self.__redirect('/muesli/user/login')
+        if path == '/start':
+            return self.__send(200, synthetic.startPage(range(site.config['tutorials'])))
+        if path.startswith('/tutorial/view/'):
+            return self.__send(200, site.tutorialPage(int(path.split('/')[-1])))
+        self.__send(404, 'Not found')
+
+    def __dispatch(self, method):
+        with self.counter.get_lock():
+            self.counter.value += 1
+        if self.site.config['latency'] > 0:
+            sleep(self.site.config['latency'])
+
+        if method == 'POST':
+            length = int(self.headers.get('Content-Length') or 0)
+            self.rfile.read(length)
+
+        url = urlsplit(self.path)
+        path, query = unquote(url.path), parse_qs(url.query)
+        if path.startswith('/moodle'):
+            self.__moodle(method, path[len('/moodle'):], query)
+        elif path.startswith('/muesli'):
+            self.__muesli(method, path[len('/muesli'):], query)
+        else:
+            self.__send(404, 'Not found')
+
+    def do_GET(self):
+        self.__dispatch('GET')
+
+    def do_POST(self):
+        self.__dispatch('POST')
+
+#------------------------------------------------------------------------------
+
+def serve(config, port, ready, counter):
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    server.daemon_threads = True
+    Handler.site = Site(config, 'http://127.0.0.1:%i' % server.server_port)
+    Handler.counter = counter
+    ready.put(server.server_port)
+    server.serve_forever()
+
+#==============================================================================
+
+class Simulator:
+
+    """
+        Runs the server in a child process:
+            with Simulator(submissions = 1000, latency = 0.02) as sim:
+                Moodle(acc, baseURL = sim.moodleURL) ...
+    """
+    def __init__(self, port = 0, **config):
+        self.__config = dict(DEFAULTS)
+        self.__config.update(config)
+        self.__port = port
+        self.__process = None
+        self.__counter = multiprocessing.Value('l', 0)
+
+    @property
+    def config(self):
+        return dict(self.__config)
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%i' % self.__port
+
+    @property
+    def moodleURL(self):
+        return self.url + '/moodle'
+
+    @property
+    def muesliURL(self):
+        return self.url + '/muesli'
+
+    @property
+    def requests(self):
+        """ Number of requests served so far """
+        return self.__counter.value
+
+    def courseURL(self):
+        return self.moodleURL + '/course/view.php?id=%i' % COURSE
+
+    #--------------------------------------------------------------------------
+
+    def start(self):
+        ready = multiprocessing.Queue()
+        self.__process = multiprocessing.Process(target = serve, daemon = True
+                                                 , args = (self.__config, self.__port, ready, self.__counter))
+        self.__process.start()
+        self.__port = ready.get(timeout = 60)
+        return self
+
+    def stop(self):
+        if self.__process is not None:
+            self.__process.terminate()
+            self.__process.join()
+            self.__process = None
+
+    def __enter__ (self):
+        return self.start()
+
+    def __exit__ (self, type, value, traceback):
+        self.stop()
+
+#==============================================================================
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Local stand-in for Moodle and MÜSLI')
+    parser.add_argument('--port', type = int, default = 8080)
+    parser.add_argument('--submissions', type = int, default = DEFAULTS['submissions'])
+    parser.add_argument('--tutorials', type = int, default = DEFAULTS['tutorials'])
+    parser.add_argument('--archive-kib', type = int, default = DEFAULTS['archiveKiB'])
+    parser.add_argument('--latency', type = float, default = 0, help = 'milliseconds per request')
+    args = parser.parse_args()
+
+    config = dict(DEFAULTS)
+    config.update({'submissions' : args.submissions, 'tutorials' : args.tutorials
+                   , 'archiveKiB' : args.archive_kib, 'latency' : args.latency / 1000})
+
+    ready = multiprocessing.Queue()
+    print('Serving on http://127.0.0.1:%i (moodle, muesli) - Ctrl+C to stop' % args.port)
+    try:
+        serve(config, args.port, ready, multiprocessing.Value('l', 0))
+    except KeyboardInterrupt:
+        pass
+
+#==============================================================================
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:48:10 2026
+
+Startup time of the entry points, every run in a fresh interpreter.
+
+    python -m bench.startup [--repeat R] [--submissions N]
+
+Process ms is the wall time of the whole interpreter, Import ms only the
+imports (and for 'local sheet' reading the corrected submissions of a
+sheet with N rows). Heavy lists the expensive dependencies which were
+really executed, the lazily imported ones do not count until they are
+used. An entry point that fails is reported with the last line of its
+error.
+
+@author: ctoffer
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+from os.path import abspath
+from os.path import dirname as p_dirname
+from os.path import join as p_join
+from os import makedirs as o_mkdirs
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from folder import LocalSubmission
+from util import DataTable
+
+from bench import synthetic
+from bench.common import printTable
+from bench.micro import submissionsOf
+
+#==============================================================================
+
+HEADER = ['Entry point', 'Process ms', 'Import ms', 'Heavy']
+HEAVY = ['requests', 'bs4', 'rarfile', 'pip', 'multiprocessing']
+REPO = p_dirname(p_dirname(abspath(__file__)))
+
+ENTRY_POINTS = [('interpreter', 'pass')
+                , ('mdc', 'import mdc')
+                , ('sbm_dload', 'import sbm_dload')
+                , ('manifest', 'import manifest')
+                , ('blobstore', 'import blobstore')
+                , ('mdstore', 'import mdstore')
+                , ('local sheet', 'from folder import SubmissionFolder\n'
+                                  'SubmissionFolder(ROOT, 1).getLocalSubmissions()')]
+
+# the last line of the output is the result, the code may print before
+CHILD = '''
+import json, sys
+from time import perf_counter
+ROOT = %r
+start = perf_counter()
+%s
+seconds = perf_counter() - start
+loaded = [m for m in %r if type(sys.modules.get(m)).__name__ == 'module']
+print(json.dumps({'Seconds' : seconds, 'Loaded' : loaded}))
+'''
+
+#------------------------------------------------------------------------------
+
+def writeSheet(root, submissions):
+    """ A sheet with corrected submissions, as left behind by sbm_dload.py """
+    students = synthetic.roster(submissions)
+    names = synthetic.fileNames(students, 'Tutor')
+    mod = p_join(root, 'Blatt_01', '1_Modificated')
+    o_mkdirs(mod, exist_ok = True)
+    DataTable.writeToFile(p_join(mod, 'localsubms.table'), LocalSubmission.keys()
+                          , submissionsOf(students, names), to_dict = LocalSubmission.toDict)
+
+def runChild(code, root):
+    """ (wall seconds, {Seconds, Loaded}) or (wall seconds, error) """
+    start = perf_counter()
+    proc = subprocess.run([sys.executable, '-c', CHILD % (root, code, HEAVY)], cwd = REPO
+                          , stdout = subprocess.PIPE, stderr = subprocess.PIPE
+                          , universal_newlines = True)
+    seconds = perf_counter() - start
+
+    if proc.returncode != 0:
+        lines = proc.stderr.strip().splitlines()
+        return seconds, lines[-1] if lines else 'exit code %i' % proc.returncode
+    return seconds, json.loads(proc.stdout.strip().splitlines()[-1])
+
+def run(repeat, submissions):
+    rows = []
+    with TemporaryDirectory() as root:
+        writeSheet(root, submissions)
+
+        for name, code in ENTRY_POINTS:
+            results = [runChild(code, root) for _ in range(repeat)]
+            errors = [result for _, result in results if isinstance(result, str)]
+
+            row = dict()
+            row['Entry point'] = name
+            row['Process ms'] = '%.1f' % (min(seconds for seconds, _ in results) * 1000)
+            if errors:
+                row['Import ms'] = 'failed'
+                row['Heavy'] = errors[-1]
+            else:
+                row['Import ms'] = '%.1f' % (min(result['Seconds'] for _, result in results) * 1000)
+                row['Heavy'] = ' '.join(results[-1][1]['Loaded'])
+            rows.append(row)
+
+    return rows
+
+#==============================================================================
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Startup time of the entry points')
+    parser.add_argument('--repeat', type = int, default = 5)
+    parser.add_argument('--submissions', type = int, default = 200
+                        , help = 'rows of the sheet read by local sheet')
+    args = parser.parse_args()
+
+    printTable(HEADER, run(args.repeat, args.submissions))
+
+#==============================================================================
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:51:16 2026
+
+Synthetic rosters and pages in the shape of the Moodle and MÜSLI markup
+the scrapers expect. Everything is derived from a seed, so runs repeat.
+
+@author: ctoffer
+"""
+
+from random import Random
+
+from student import Student
+
+#==============================================================================
+
+FIRST = ['Jürgen', 'Anna', 'Lena', 'Max', 'Sören', 'Ömer', 'Lukas', 'Marie'
+         , 'Björn', 'Jonas', 'Änne', 'Felix', 'Sophie', 'Paul', 'Mia', 'Ben']
+LAST = ['Müller', 'Schmidt', 'Schneider', 'Fischer', 'Weiß', 'Meyer', 'Wagner'
+        , 'Becker', 'Schulz', 'Hoffmann', 'Schäfer', 'Koch', 'Bauer', 'Richter'
+        , 'Klein', 'Wolf', 'Schröder', 'Neumann', 'Schwarz', 'Zimmermann']
+DAYS = [('Mo', 'Montag'), ('Di', 'Dienstag'), ('Mi', 'Mittwoch')
+        , ('Do', 'Donnerstag'), ('Fr', 'Freitag')]
+TIMES = ['09:00', '11:00', '14:00', '16:00']
+
+SUBJECT = 'Einführung in die praktische Informatik'
+MOODLE = 'https://elearning2.uni-heidelberg.de'
+
+#------------------------------------------------------------------------------
+
+def names(n, seed = 0, distinct = False):
+    """
+        n distinct names, including double first and last names.
+        With distinct = True no name matches another one in the sense of
+        the NameComparator: every last name gets a random suffix and there
+        are no double last names.
+    """
+    rnd = Random(seed)
+    result, seen = [], set()
+
+    while len(result) < n:
+        first = rnd.choice(FIRST)
+        last = rnd.choice(LAST)
+        if rnd.random() < 0.15:
+            first += '-' + rnd.choice(FIRST)
+        if distinct:
+            last += ''.join(rnd.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(6))
+            if last in seen:
+                continue
+            seen.add(last)
+        elif rnd.random() < 0.1:
+            last += ' ' + rnd.choice(LAST)
+        name = '%s %s' % (first, last)
+
+        # keep the names unique, like a real roster
+        if name in seen:
+            name = '%s %s%i' % (first, last, len(result))
+        seen.add(name)
+        result.append(name)
+
+    return result
+
+def mailOf(name, i):
+    return '%s.%i@stud.uni-heidelberg.de' % (name.lower().replace(' ', '.'), i)
+
+def slot(t):
+    """ (day abbreviation, day, time) of tutorial number t """
+    short, day = DAYS[t % len(DAYS)]
+    return (short, day, TIMES[t // len(DAYS) % len(TIMES)])
+
+def roster(n, tutorials = 4, seed = 0, tutor = 'Max Tutor', distinct = False):
+    """ n Students spread over the given number of tutorials """
+    students = []
+    for i, name in enumerate(names(n, seed, distinct)):
+        _, day, time = slot(i % tutorials)
+        students.append(Student(name, mailOf(name, i), SUBJECT, day, time, tutor))
+    return students
+
+def fileNames(students, tutorLastname = 'Tutor', sheetNr = 1, seed = 0):
+    """
+        One submission file name per student in the styles students use:
+        correct, CamelCase, with spaces, with a partner in parentheses and
+        without the tutor prefix.
+    """
+    rnd = Random(seed)
+    prefix = '%s_Blatt%s' % (tutorLastname.upper(), str(sheetNr).zfill(2))
+    result = []
+
+    for i, stud in enumerate(students):
+        dashed = stud.name.replace(' ', '-')
+        partner = students[(i + 1) % len(students)].name.replace(' ', '_')
+        style = rnd.choice(['correct', 'camel', 'spaces', 'paren', 'short'])
+
+        if style == 'correct':
+            result.append('%s_%s.zip' % (prefix, dashed))
+        elif style == 'camel':
+            result.append('Blatt%i_%s.zip' % (sheetNr, stud.name.replace(' ', '')))
+        elif style == 'spaces':
+            result.append('%s %s.tar.gz' % (prefix, stud.name))
+        elif style == 'paren':
+            result.append('%s_%s_(%s).zip' % (prefix, dashed, partner))
+        else:
+            result.append('%s.rar' % stud.name.split(' ')[-1].lower())
+
+    return result
+
+#==============================================================================
+# Moodle
+
+def categoryPage(ids, baseURL = MOODLE):
+    anchors = ['<li><a href="%s/course/index.php?categoryid=%i">Kategorie %i</a></li>' \
+               % (baseURL, i, i) for i in ids]
+    return '<html><body><ul>%s</ul></body></html>' % ''.join(anchors)
+
+def coursesPage(ids, baseURL = MOODLE):
+    anchors = ['<div class="coursename"><a href="%s/course/view.php?id=%i">Kurs %i</a></div>' \
+               % (baseURL, i, i) for i in ids]
+    return '<html><body><div class="course_category_tree clearfix ">%s</div></body></html>' \
+            % ''.join(anchors)
+
+def coursePage(sheets, assignURL, baseURL = MOODLE):
+    anchors = ['<li><a onclick="" href="%s">Übungsblatt %i Aufgabe</a></li>' \
+               % (assignURL(nr), nr) for nr in sheets]
+    return '<html><body><ul>%s</ul></body></html>' % ''.join(anchors)
+
+def assignPage(gradingURL):
+    return '<html><body><a class="btn" href="%s">Alle Abgaben anzeigen</a></body></html>' \
+            % gradingURL
+
+def gradingPage(students, fileURL, contextId = 4711, cmId = 815, userId = 42
+                , seed = 0, baseURL = MOODLE):
+    """
+        The grading table of an assignment, one row per student.
+        fileURL(i, name) returns the (url, file name) of the submission or None.
+    """
+    rnd = Random(seed)
+    rows = []
+
+    for i, name in enumerate(students):
+        submission = fileURL(i, name)
+        late = rnd.random() < 0.1
+
+        state = '<div class="submissionstatussubmitted">Zur Bewertung abgegeben</div>'
+        if late:
+            state += '<div class="overduesubmission">Aufgabe wurde 1 Stunde verspätet abgegeben</div>'
+        if submission is None:
+            state = '<div class="submissionstatus">Keine Abgabe</div>'
+
+        files = '' if submission is None else \
+                '<div class="fileuploadsubmission"><a target="_blank" href="%s">%s</a></div>' % submission
+
+        cells = ['<input type="checkbox" name="selectedusers" value="%i">' % i
+                 , '<img src="%s/pix/u/f2.png">' % baseURL
+                 , '<a href="%s/user/view.php?id=%i">%s</a>' % (baseURL, i, name)
+                 , mailOf(name, i)
+                 , state
+                 , '<div>-</div>'
+                 , '<a href="#">Bearbeiten</a>'
+                 , 'Montag, 30. Oktober 2017, 12:00'
+                 , files
+                 , '', '', '', '', '']
+        classes = ['cell c%i' % c for c in range(len(cells))]
+        classes[3] += ' email'
+
+        tds = ''.join('<td class="%s">%s</td>' % (cls, cell) for cls, cell in zip(classes, cells))
+        rows.append('<tr id="mod_assign_grading_r%i">%s</tr>' % (i, tds))
+
+    # the real page carries lots of navigation around the table
+    navigation = ''.join('<li><a href="%s/course/view.php?id=%i">Kurs %i</a></li>' \
+                         % (baseURL, i, i) for i in range(200))
+
+    return ('<html><head><script>M.cfg = {"wwwroot":"%s","sesskey":"s3ssk3y","themerev":"1"};</script></head>'
+            + '<body class="path-mod-assign context-%i cmid-%i">'
+            + '<nav><ul>%s</ul></nav>'
+            + '<a class="icon menu-action" role="menuitem" data-title="profile,moodle" href="%s/user/profile.php?id=%i">Profil</a>'
+            + '<table class="flexible generaltable generalbox"><thead><tr><th>Name</th></tr></thead>'
+            + '<tbody>%s</tbody></table></body></html>') \
+            % (baseURL, contextId, cmId, navigation, baseURL, userId, ''.join(rows))
+
+#==============================================================================
+# MÜSLI
+
+def startPage(tutorialIds):
+    anchors = ['<li><a href="/tutorial/view/%i">Übungsgruppe %i</a></li>' % (i, i) \
+               for i in tutorialIds]
+    return '<html><body><ul>%s</ul></body></html>' % ''.join(anchors)
+
+def tutorialPage(students, day = 'Mo', time = '16:00', tutor = 'Max Tutor'):
+    rows = ['<tr><td><a href="mailto:%s">%s</a></td><td>%s</td></tr>' \
+            % (s.mail, s.name, s.subject) for s in students]
+    return ('<html><body><h2>Übungsgruppe zur \n  Vorlesung %s\n am %s %s (SR B128, Mathematikon B)</h2>'
+            + '<p>Tutor: %s</p>'
+            + '<table class="colored"><tr><th>Name</th><th>Fach</th></tr>%s</table>'
+            + '</body></html>') % (SUBJECT, day, time, tutor, ''.join(rows))
+
+#==============================================================================
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:05:41 2026
+
+Content addressed storage for the downloaded submissions.
+
+Every archive in 0_Origin is a hardlink to a blob named after the sha256
+of its content, so identical uploads are stored once. Where a hardlink is
+not possible (other filesystem, no link support) the file is copied.
+
+The later stages get their own copies (checkout), they are edited by
+hand and an in-place write must not reach the original and its blob.
+Where the filesystem supports it (btrfs, xfs, ...) the copy is a reflink,
+which shares the storage of the blob until one of them is written.
+
+A blob is referenced by every file under the root with its content. A
+hardlink is recognised by the link count, a copied file by its digest.
+
+    python blobstore.py gc   - delete the unreferenced blobs
+
+@author: ctoffer
+"""
+
+import hashlib
+import os
+import sys
+
+from os import getcwd as o_getcwd
+from os import link as o_link
+from os import makedirs as o_mkdirs
+from os import remove as o_remove
+from os import replace as o_replace
+from os import stat as o_stat
+from os import walk as o_walk
+from os.path import basename as p_basename
+from os.path import exists as p_exists
+from os.path import join as p_join
+
+from shutil import copyfile as s_copyfile
+from shutil import copyfileobj as s_copyfileobj
+
+try:
+    from fcntl import ioctl
+except ImportError:
+    # not on Windows
+    ioctl = None
+
+#==============================================================================
+
+BLOB_FOLDER = 'Blobs'
+CHUNK_SIZE = 1 << 20
+FICLONE = 0x40049409         # _IOW(0x94, 9, int) of linux/fs.h
+
+#------------------------------------------------------------------------------
+
+def hashFile(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda : fp.read(CHUNK_SIZE), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def linkOrCopy(src, dest):
+    """ Returns True if dest is a hardlink of src, False if it is a copy """
+    if p_exists(dest):
+        o_remove(dest)
+
+    try:
+        o_link(src, dest)
+        return True
+    except OSError:
+        s_copyfile(src, dest)
+        return False
+
+def cloneFile(src, dest):
+    """
+        Copies src to dest, returns True if dest is a reflink which shares
+        the storage of src. Otherwise copy_file_range lets the kernel copy
+        (and on some filesystems share) the data, the last resort is a
+        plain copy.
+    """
+    with open(src, 'rb') as fsrc, open(dest, 'wb') as fdest:
+        if ioctl is not None:
+            try:
+                ioctl(fdest.fileno(), FICLONE, fsrc.fileno())
+                return True
+            except OSError:
+                pass
+
+        if hasattr(os, 'copy_file_range'):
+            try:
+                while os.copy_file_range(fsrc.fileno(), fdest.fileno(), CHUNK_SIZE) > 0:
+                    pass
+                return False
+            except OSError:
+                fsrc.seek(0)
+                fdest.seek(0)
+                fdest.truncate()
+
+        s_copyfileobj(fsrc, fdest, CHUNK_SIZE)
+        return False
+
+def copyPrivate(src, dest):
+    """ dest becomes a file of its own with the content of src """
+    # dest may still be a link of a blob, writing into it would change the blob
+    if p_exists(dest):
+        o_remove(dest)
+    cloneFile(src, dest)
+
+#==============================================================================
+
+class BlobStore:
+
+    def __init__(self, root = None):
+        if root is None:
+            root = o_getcwd()
+
+        self.__root = root
+        self.__path = p_join(root, BLOB_FOLDER)
+
+    @property
+    def path(self):
+        return self.__path
+
+    def blobPath(self, digest):
+        return p_join(self.__path, digest[:2], digest)
+
+    #--------------------------------------------------------------------------
+
+    def put(self, path):
+        """
+            Moves the content of path into the store and replaces path by a
+            link to its blob. Returns the digest.
+        """
+        digest = hashFile(path)
+        blob = self.blobPath(digest)
+
+        if p_exists(blob):
+            # same content is already stored, drop the duplicate
+            if o_stat(blob).st_ino != o_stat(path).st_ino:
+                linkOrCopy(blob, path + '.blob')
+                o_replace(path + '.blob', path)
+        else:
+            o_mkdirs(p_join(self.__path, digest[:2]), exist_ok = True)
+            linkOrCopy(path, blob)
+
+        return digest
+
+    def checkout(self, src, dest):
+        """ A writable copy (or reflink) of the stored file src at dest, see copyPrivate """
+        copyPrivate(src, dest)
+
+    #--------------------------------------------------------------------------
+
+    def blobs(self):
+        for folder, _, fnames in o_walk(self.__path):
+            for fname in fnames:
+                yield p_join(folder, fname)
+
+    def references(self, sizes):
+        """
+            The digests of the files under the root whose size is one of
+            sizes. The store itself is skipped.
+        """
+        digests = set()
+        for folder, dnames, fnames in o_walk(self.__root):
+            dnames[:] = [d for d in dnames if p_join(folder, d) != self.__path]
+            for fname in fnames:
+                path = p_join(folder, fname)
+                try:
+                    # only a file of the same size may have the same content
+                    if o_stat(path).st_size in sizes:
+                        digests.add(hashFile(path))
+                except OSError:
+                    continue
+        return digests
+
+    def collect(self):
+        """ Deletes the unreferenced blobs. Returns (count, bytes) freed """
+        # a blob with another link is referenced by that hardlink, the
+        # others may still be copied to a stage (put without link support)
+        candidates = dict()
+        for blob in self.blobs():
+            stat = o_stat(blob)
+            if stat.st_nlink <= 1:
+                candidates[p_basename(blob)] = stat.st_size
+
+        if len(candidates) == 0:
+            return 0, 0
+
+        referenced = self.references(set(candidates.values()))
+        count, size = 0, 0
+        for digest, nbytes in candidates.items():
+            if digest not in referenced:
+                o_remove(self.blobPath(digest))
+                count += 1
+                size += nbytes
+        return count, size
+
+#==============================================================================
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else ''
+
+    if command != 'gc':
+        print('Usage: python blobstore.py gc')
+        sys.exit(1)
+
+    count, size = BlobStore(o_getcwd()).collect()
+    print('Deleted %i unreferenced blobs (%i KiB)' % (count, size // 1024))
+
+#==============================================================================
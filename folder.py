@@ -6,6 +6,8 @@ Created on Thu Nov  2 10:51:47 2017
 @author: ctoffer
 """
 
+import sys
+
 from os.path import basename
 from os.path import splitext
 from re import compile as rcompile
@@ -17,19 +19,27 @@ from os.path import isdir as p_isdir
 from os import getcwd as o_getcwd
 from os import makedirs as o_mkdirs
 from os import remove as o_remove
+from os import rename as o_rename
+from os import walk as o_walk
+from os import getpid as o_getpid
+from os.path import getsize as p_getsize
+
+from time import perf_counter
 
-from shutil import copyfile as s_copyfile
 from shutil import rmtree as s_rmtree
 
 from tarfile import open as taropen
 from zipfile import ZipFile
 from zipfile import ZIP_DEFLATED
-from rarfile import RarFile
 
+from blobstore import BlobStore
+from manifest import MEMBER_KEYS, readManifests
 from moodle import Moodle, MoodleSubmission
-from util import DataTable
+from util import DataTable, IndexedTable, lazyImport
+import tracing
 from mdc import MetaData
-from student import StudentFilter
+
+rarfile = lazyImport('rarfile')
 
 #==============================================================================
 
@@ -69,14 +79,54 @@ class LocalSubmission:
 def touchFolder(path):
     if not p_exists(path):
         o_mkdirs(path)
+        
+#------------------------------------------------------------------------------
 
-class SubmissionFolder:
+ARCHIVE_OPENERS = {'tar.gz' : lambda tgzFile: taropen(tgzFile, 'r:gz'),
+                   'tar' : lambda   tFile: taropen(tFile, 'r:'),
+                   'zip' : lambda   zFile: ZipFile(zFile, 'r'),
+                   'rar' : lambda   rFile: rarfile.RarFile(rFile, 'r')
+                  }
+
+def folderSize(path):
+    files, size = 0, 0
+    for folder, _, fnames in o_walk(path):
+        for fname in fnames:
+            files += 1
+            size += p_getsize(p_join(folder, fname))
+    return files, size
+
+def unpackArchive(src, dest):
+    """
+        Extracts src into a folder named after the archive inside dest.
+        Runs in a worker process, so errors are reported in the result
+        instead of being raised:
+            {'Archive', 'Path', 'Files', 'Bytes', 'Error', 'Start', 'Seconds', 'Pid'}
+    """
+    start = perf_counter()
+    result = {'Archive' : src, 'Path' : None, 'Files' : 0, 'Bytes' : 0, 'Error' : None
+              , 'Start' : start, 'Seconds' : 0.0, 'Pid' : o_getpid()}
     
-    __opener = {'tar.gz' : lambda tgzFile: taropen(tgzFile, 'r:gz'),
-                 'tar' : lambda   tFile: taropen(tFile, 'r:'),
-                 'zip' : lambda   zFile: ZipFile(zFile, 'r'),
-                 'rar' : lambda   rFile: RarFile(rFile, 'r')
-              }
+    try:
+        for extension, opener in ARCHIVE_OPENERS.items():
+            if src.endswith(extension):
+                with opener(src) as locFile:
+                    path = p_join(dest, basename(src)[0:-len('.' + extension)])
+                    locFile.extractall(path)
+                    result['Path'] = path
+                    result['Files'], result['Bytes'] = folderSize(path)
+                    break
+        else:
+            result['Error'] = 'Unsupported archive'
+    except Exception as e:
+        result['Error'] = '%s: %s' % (type(e).__name__, e)
+        
+    result['Seconds'] = perf_counter() - start
+    return result
+
+#==============================================================================
+
+class SubmissionFolder:
     
     def __init__(self, root = None, sheetNr = 0):
         if root is None:
@@ -96,28 +146,100 @@ class SubmissionFolder:
         touchFolder(self.__wor)
         touchFolder(self.__fin)
         
-        self.__mdata = MetaData()
-        self.__fil = StudentFilter(self.__mdata.getStudents())
+        self.__blobs = BlobStore(self.__root)
+        self.__metaData = None
+        self.__localTable = None
         
     #--------------------------------------------------------------------------
     
-    def getOriginalSubmissions(self):
-        path = p_join(self.__org, "lsubms.table")
+    # MetaData is built on first use and the roster is only loaded by the
+    # steps matching students against it
+    @property
+    def __mdata(self):
+        if self.__metaData is None:
+            self.__metaData = MetaData(self.__root)
+        return self.__metaData
+    
+    @property
+    def __fil(self):
+        # built once per roster file by MetaData
+        return self.__mdata.getStudentFilter()
+        
+    #--------------------------------------------------------------------------
+    
+    def __readStage(self, stage, path):
+        store = self.__mdata.store
+        if store is not None:
+            rows = store.getSubmissions(self.__nr, stage)
+            return None if rows is None else list(map(LocalSubmission.fromDict, rows))
+        
         if p_exists(path):
             return DataTable.readFromFile(path, LocalSubmission.fromDict)
         else:
             return None
+        
+    def __writeStage(self, stage, path, rows, header = LocalSubmission.keys(), to_dict = LocalSubmission.toDict):
+        store = self.__mdata.store
+        if store is not None:
+            store.putSubmissions(self.__nr, stage, list(map(to_dict, rows)))
+            return
+        
+        with open(path, 'w', encoding = 'utf-8') as fp:
+            DataTable(header, rows, to_dict = to_dict).printToStream(stream = fp)
+    
+    def getOriginalSubmissions(self):
+        return self.__readStage('origin', p_join(self.__org, "lsubms.table"))
     
     def getLocalSubmissions(self):
-        path = p_join(self.__mod, 'localsubms.table')
-        if p_exists(path):
-            return DataTable.readFromFile(path, LocalSubmission.fromDict)
+        return self.__readStage('local', p_join(self.__mod, 'localsubms.table'))
+    
+    def getLocalSubmission(self, mail):
+        """ The local submission of the given mail without reading the whole stage """
+        store = self.__mdata.store
+        if store is not None:
+            row = store.getSubmission(self.__nr, 'local', mail)
+            return None if row is None else LocalSubmission.fromDict(row)
+        
+        table = self.__indexedLocals()
+        return None if table is None else table.get(mail, LocalSubmission.fromDict)
+    
+    def updateLocalSubmission(self, lsubm : LocalSubmission):
+        """ Writes the path of a single local submission back to its stage """
+        store = self.__mdata.store
+        if store is not None:
+            store.updateSubmissionPath(self.__nr, 'local', lsubm.subm.mail, lsubm.path)
         else:
-            return None
+            self.__indexedLocals().update(lsubm.subm.mail, lsubm.toDict())
+            
+    def __indexedLocals(self):
+        # one index (and memory map) per folder, shared by all single row accesses
+        path = p_join(self.__mod, 'localsubms.table')
+        if self.__localTable is None and p_exists(path):
+            self.__localTable = IndexedTable(path, 'Mail')
+        return self.__localTable
+    
+    def renameLocalSubmission(self, mail, fileName):
+        """
+            Renames the corrected archive of one student, e.g. after a manual
+            fix, and updates only its row of the local stage.
+        """
+        ssc = SubmissionSyntaxCorrector(self.__mdata.getTutorLastname(), self.__nr)
+        if not ssc.isCorrect(fileName):
+            raise ValueError('Wrong syntax: %s' % fileName)
+        
+        lsubm = self.getLocalSubmission(mail)
+        if lsubm is None:
+            raise KeyError('No local submission of %s' % mail)
+        
+        npath = p_join(self.__mod, fileName)
+        o_rename(lsubm.path, npath)
+        lsubm.path = npath
+        self.updateLocalSubmission(lsubm)
+        return lsubm
         
     #--------------------------------------------------------------------------    
     
-    def downloadSubsIntoOrigin(self, moodle : Moodle):
+    def downloadSubsIntoOrigin(self, moodle : Moodle, workers = 1, stream = False):
         print('SubmissionFolder#downloadSubsIntoOrigin')
         logPath = p_join(self.__org, "log.txt")
         submPath = p_join(self.__org, "lsubms.table")
@@ -129,17 +251,30 @@ class SubmissionFolder:
             
             # result list of tuples(subm, local url)
             print('Folder->Moodle#downloadAllSubmissions', self.__fil is None)
-            lsubms = moodle.downloadAllSubmissions(self.__org, self.__mdata.getMoodleCourse(), self.__nr, filt = self.__fil)
+            downloads = moodle.downloadAllSubmissions(self.__org, self.__mdata.getMoodleCourse(), self.__nr, filt = self.__fil, workers = workers, stream = stream)
+            lsubms = [LocalSubmission(subm, path) for subm, path in downloads]
+            
+            # the originals live in the blob store, the later stages get copies
+            for lsubm in lsubms:
+                self.__blobs.put(lsubm.path)
             
-            with open(submPath, 'w', encoding = 'utf-8') as fp:
-                DataTable(LocalSubmission.keys(), lsubms, to_dict = LocalSubmission.toDict).printToStream(fp)
+            # without the stage the next run downloads the sheet again and
+            # resumes the failed downloads from their .part files
+            if len(moodle.failedDownloads) == 0:
+                self.__writeStage('origin', submPath, lsubms)
+            else:
+                print('Origin stage not written, %i downloads failed - run again to retry them' % len(moodle.failedDownloads))
                 
             for lsubm in lsubms:
                 subm = lsubm.subm
-                print("%s" % subm.name, subm.mail, subm.fileURL, file = log)
+                print("%s" % subm.name, subm.mail, subm.fileURL, subm.transfer, file = log)
+                
+            for subm, error in moodle.failedDownloads:
+                print("FAILED %s" % subm.name, subm.mail, subm.fileURL, error, file = log)
                 
             print("Finished downloading", file = log)
             print("Downloaded %s submissions" % len(lsubms), file = log)
+            print("Failed %s downloads" % len(moodle.failedDownloads), file = log)
             print(file = log)
             
             return lsubms
@@ -166,7 +301,7 @@ class SubmissionFolder:
         # Yay they have the correct syntax
         for lsubm in rSyn:
             npath = p_join(self.__mod, basename(lsubm.path))
-            s_copyfile(lsubm.path, npath)
+            self.__blobs.checkout(lsubm.path, npath)
             lsubm.path = npath
             nLsubms.append(lsubm)
         
@@ -176,7 +311,9 @@ class SubmissionFolder:
         for lsubm in wSyn:
             print("Try autocorrect on %s (%s)" % (basename(lsubm.path), lsubm.subm.name))
             print("Try autocorrect on %s (%s)" % (basename(lsubm.path), lsubm.subm.name), file = log)
-            npath, flag = ssc.autocorrect(lsubm.path, self.__mdata.getStudentsByName)
+            with tracing.span('autocorrect', cat = 'submission', file = basename(lsubm.path)) as span:
+                npath, flag = ssc.autocorrect(lsubm.path, self.__mdata.getStudentsByName)
+                span.set(corrected = flag)
             print(npath, flag)
             print(npath, flag, file = log)
             
@@ -185,7 +322,7 @@ class SubmissionFolder:
                 print("Success")
                 print("Success", file = log)
                 npath = p_join(self.__mod, basename(npath))
-                s_copyfile(lsubm.path, npath)
+                self.__blobs.checkout(lsubm.path, npath)
                 lsubm.path = npath
                 nLsubms.append(lsubm)
                 aFixed += 1
@@ -195,7 +332,7 @@ class SubmissionFolder:
                 print("Failure - need human advice")
                 print("Failure - need human advice", file = log)
                 npath = p_join(self.__mod, basename(ssc.correct(lsubm)))
-                s_copyfile(lsubm.path, npath)
+                self.__blobs.checkout(lsubm.path, npath)
                 lsubm.path = npath
                 nLsubms.append(lsubm)
                 mFixed += 1
@@ -211,23 +348,52 @@ class SubmissionFolder:
         print(file = log)
         log.close()
         
-        with open(p_join(self.__mod, 'localsubms.table'), 'w', encoding = 'utf-8') as fp:
-            DataTable(LocalSubmission.keys(), nLsubms, to_dict=LocalSubmission.toDict).printToStream(stream = fp)
+        self.__writeStage('local', p_join(self.__mod, 'localsubms.table'), nLsubms)
         
         return nLsubms
     
     #--------------------------------------------------------------------------
     
-    def __unpack(self, src, dest):
-        for extension, opener in SubmissionFolder.__opener.items():
-            if src.endswith(extension):
-                with opener(src) as locFile:
-                    path = p_join(dest, basename(src)[0:-len('.' + extension)])
-                    locFile.extractall(path)
-                    return path
+    def buildManifest(self, lsubms = None, workers = 4):
+        """
+            Lists the members of the local submissions without extracting
+            them and writes them to 1_Modificated/manifest.table.
+            Returns the Manifests or None if there are no local submissions.
+        """
+        if lsubms is None:
+            lsubms = self.getLocalSubmissions()
+        if lsubms is None:
+            return None
+        
+        manifests = readManifests(lsubms, workers = workers)
+        rows = [row for manifest in manifests for row in manifest.memberRows()]
+        DataTable.writeToFile(p_join(self.__mod, 'manifest.table'), MEMBER_KEYS, rows)
+        
+        return manifests
     
-    def unpackIntoWorking(self, lsubms):
-        log = open("log.txt", "w+", encoding = "utf-8")
+    #--------------------------------------------------------------------------
+    
+    def __unpackAll(self, jobs, workers):
+        if workers <= 1:
+            for src, dest in jobs:
+                yield unpackArchive(src, dest)
+            return
+        
+        # multiprocessing is only imported when a pool is used
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        with ProcessPoolExecutor(max_workers = workers) as pool:
+            futures = [pool.submit(unpackArchive, src, dest) for src, dest in jobs]
+            for future in as_completed(futures):
+                yield future.result()
+    
+    def unpackIntoWorking(self, lsubms, workers = 1):
+        """
+            Extracts every local submission into the folder of its tutorial.
+            With workers > 1 the archives are extracted by a process pool.
+            A broken archive is logged and skipped, the others are unpacked.
+            Returns the results of unpackArchive in the order of lsubms.
+        """
+        log = open(p_join(self.__wor, "log.txt"), "w+", encoding = "utf-8")
         tids = self.__mdata.getTIDs()
         
         print("=" * 30, file = log)
@@ -237,7 +403,7 @@ class SubmissionFolder:
         for tid in tids:
             touchFolder(p_join(self.__wor, tid))
             
-        workingFolders = list()
+        jobs = list()
             
         for lsubm in lsubms:
             students = self.__mdata.getStudentsByName(lsubm.subm.name)
@@ -245,16 +411,51 @@ class SubmissionFolder:
             student = students[0]
             print("Unpack %s into %s" % (basename(lsubm.path), student.tid))
             print("Unpack %s into %s" % (basename(lsubm.path), student.tid), file = log)
-            workingFolders += self.__unpack(lsubm.path, p_join(self.__wor, student.tid))
+            jobs.append((lsubm.path, p_join(self.__wor, student.tid)))
+            
+        start = perf_counter()
+        results = list(self.__unpackAll(jobs, workers))
+        elapsed = perf_counter() - start
+        
+        # keep the order of lsubms, the pool finishes in any order
+        order = {src : i for i, (src, _) in enumerate(jobs)}
+        results.sort(key = lambda r : order[r['Archive']])
+        workingFolders = [r['Path'] for r in results if r['Error'] is None]
+        
+        # the workers can not trace, their timings are recorded here
+        for r in results:
+            tracing.record('extract', r['Start'], r['Seconds'], cat = 'submission', pid = r['Pid']
+                           , tid = r['Pid'], archive = basename(r['Archive']), files = r['Files']
+                           , bytes = r['Bytes'], error = r['Error'])
+        
+        for r in results:
+            if r['Error'] is not None:
+                print("[ERROR] %s: %s" % (basename(r['Archive']), r['Error']))
+                print("[ERROR] %s: %s" % (basename(r['Archive']), r['Error']), file = log)
+        
+        print('-' * 30, file = log)
+        toRow = lambda r : {'Archive' : basename(r['Archive'])
+                            , 'Files' : str(r['Files'])
+                            , 'KiB' : str(r['Bytes'] // 1024)
+                            , 'Seconds' : '%.2f' % r['Seconds']
+                            , 'State' : 'OK' if r['Error'] is None else 'ERROR'}
+        DataTable(['Archive', 'Files', 'KiB', 'Seconds', 'State'], results, to_dict = toRow).printToStream(stream = log)
+        
+        summary = "Unpacked %i of %i archives (%i KiB) in %.2f s with %i worker(s)" \
+                  % (len(workingFolders), len(results), sum(r['Bytes'] for r in results) // 1024, elapsed, max(workers, 1))
+        print(summary)
+        print(summary, file = log)
             
         print("Write working table...", file = log)
-        with open(p_join(self.__wor, "working.table"), 'w', encoding = 'utf-8') as fp:
-            DataTable(["Path"], workingFolders, to_dict = lambda x : {"Path" : x}).printToStream(stream = fp)
+        self.__writeStage('working', p_join(self.__wor, "working.table"), workingFolders \
+                          , header = ["Path"], to_dict = lambda x : {"Path" : x})
         print("[OK]", file = log)
         print(file = log)
         
         log.close()
         
+        return results
+        
 #==============================================================================
 
 def checkParenExpr(path):
@@ -437,4 +638,14 @@ class SubmissionSyntaxCorrector(object):
                 print('Wrong Syntax - Try again please')
         
 
-#==============================================================================    
+#==============================================================================
+
+if __name__ == '__main__':
+    if len(sys.argv) != 5 or sys.argv[1] != 'rename':
+        print('Usage: python folder.py rename <sheetNr> <mail> <fileName>')
+        sys.exit(1)
+    
+    lsubm = SubmissionFolder(sheetNr = int(sys.argv[2])).renameLocalSubmission(sys.argv[3], sys.argv[4])
+    print('Renamed the submission of %s to %s' % (lsubm.subm.name, lsubm.path))
+
+#==============================================================================
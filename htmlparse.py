@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:10:22 2026
+
+Parser backend for the scrapers in moodle.py and muesli.py.
+
+makeSoup builds the BeautifulSoup tree with the selected backend. With a
+SoupStrainer only the relevant part of the page (e.g. the grading table)
+is turned into a tree, the rest of the markup is skipped.
+
+The backend is 'lxml' if it is installed and 'html.parser' otherwise, it
+can be forced with the environment variable MTH_HTML_PARSER or setBackend.
+bs4 itself is only imported when the first page is parsed.
+
+@author: ctoffer
+"""
+
+from os import environ as o_environ
+from importlib.util import find_spec
+
+from util import lazyImport
+
+bs4 = lazyImport('bs4')
+
+#==============================================================================
+
+BACKENDS = ['lxml', 'html.parser']
+
+def availableBackends():
+    return [b for b in BACKENDS if b == 'html.parser' or find_spec(b) is not None]
+
+def checkBackend(name):
+    if name not in availableBackends():
+        raise ValueError('Parser backend %s is not available, choose one of %s' \
+                         % (name, ', '.join(availableBackends())))
+    return name
+
+# a typo in MTH_HTML_PARSER fails here and not on the first parsed page
+__backend = checkBackend(o_environ.get('MTH_HTML_PARSER', availableBackends()[0]))
+
+def setBackend(name):
+    global __backend
+    __backend = checkBackend(name)
+
+def getBackend():
+    return __backend
+
+#------------------------------------------------------------------------------
+
+def SoupStrainer(*args, **kwargs):
+    return bs4.SoupStrainer(*args, **kwargs)
+
+def makeSoup(html, only = None, backend = None):
+    return bs4.BeautifulSoup(html, backend or __backend, parse_only = only)
+
+#==============================================================================
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 12:03:47 2026
+
+Disk backed cache for the navigation pages of Moodle and MÜSLI:
+    CachedResponse - the parts of a requests.Response the scrapers use
+    PageCache      - size bounded LRU store with TTL and revalidation
+    CachedSession  - session wrapper that routes page loads over a cache
+
+Only plain page loads (GET or POST without data) are cached. An expired
+page is revalidated with If-None-Match / If-Modified-Since, so an
+unchanged page costs a 304 instead of the whole body.
+
+@author: ctoffer
+"""
+
+import json
+
+from hashlib import sha1
+from threading import Lock
+from time import time
+
+from os import listdir as o_listdir
+from os import makedirs as o_mkdirs
+from os import remove as o_remove
+from os import replace as o_replace
+from os import utime as o_utime
+from os.path import exists as p_exists
+from os.path import getsize as p_getsize
+from os.path import getmtime as p_getmtime
+from os.path import join as p_join
+
+#==============================================================================
+
+class CachedResponse:
+
+    def __init__(self, url, status_code, content, encoding, headers, fromCache):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding
+        self.headers = headers
+        self.fromCache = fromCache
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors = 'replace')
+
+#==============================================================================
+
+class PageCache:
+
+    __kept = ['ETag', 'Last-Modified', 'Content-Type']
+
+    def __init__(self, path, ttl = 24 * 3600, maxBytes = 64 * 1024 * 1024):
+        self.__path = path
+        self.__ttl = ttl
+        self.__maxBytes = maxBytes
+        self.__lock = Lock()
+
+        if not p_exists(path):
+            o_mkdirs(path)
+
+        # key -> [size, last access], the mtime of the body is the access time
+        self.__index = dict()
+        for fname in o_listdir(path):
+            if fname.endswith('.body'):
+                body = p_join(path, fname)
+                self.__index[fname[:-len('.body')]] = [p_getsize(body), p_getmtime(body)]
+
+    #--------------------------------------------------------------------------
+
+    @staticmethod
+    def key(scope, method, url):
+        return sha1(('%s %s %s' % (scope, method.upper(), url)).encode('utf-8')).hexdigest()
+
+    def __files(self, key):
+        return (p_join(self.__path, key + '.json'), p_join(self.__path, key + '.body'))
+
+    def __load(self, key):
+        metaPath, bodyPath = self.__files(key)
+        try:
+            with open(metaPath, 'r', encoding = 'utf-8') as fp:
+                meta = json.load(fp)
+            with open(bodyPath, 'rb') as fp:
+                return meta, fp.read()
+        except (OSError, ValueError):
+            return None, None
+
+    def __store(self, key, meta, body):
+        metaPath, bodyPath = self.__files(key)
+
+        # write both files under a temporary name, a crash never leaves halves
+        with open(bodyPath + '.tmp', 'wb') as fp:
+            fp.write(body)
+        with open(metaPath + '.tmp', 'w', encoding = 'utf-8') as fp:
+            json.dump(meta, fp, indent = 4)
+        o_replace(bodyPath + '.tmp', bodyPath)
+        o_replace(metaPath + '.tmp', metaPath)
+
+        with self.__lock:
+            self.__index[key] = [len(body), time()]
+        self.__evict()
+
+    def __touch(self, key):
+        with self.__lock:
+            if key in self.__index:
+                self.__index[key][1] = time()
+        try:
+            o_utime(self.__files(key)[1])
+        except OSError:
+            pass
+
+    def __evict(self):
+        with self.__lock:
+            total = sum(size for size, _ in self.__index.values())
+            lru = sorted(self.__index.items(), key = lambda kv : kv[1][1])
+            victims = []
+
+            for key, (size, _) in lru:
+                if total <= self.__maxBytes:
+                    break
+                total -= size
+                victims.append(key)
+                del self.__index[key]
+
+        for key in victims:
+            for fname in self.__files(key):
+                if p_exists(fname):
+                    o_remove(fname)
+
+    #--------------------------------------------------------------------------
+
+    def fetch(self, session, method, url, scope = '', ttl = None, **kwargs):
+        """
+            Returns a CachedResponse for the page at url. A fresh cached copy
+            is returned without any request, an expired one is revalidated.
+        """
+        ttl = self.__ttl if ttl is None else ttl
+        key = PageCache.key(scope, method, url)
+        meta, body = self.__load(key)
+
+        if meta is not None and time() - meta['Stored'] < ttl:
+            self.__touch(key)
+            return CachedResponse(meta['URL'], meta['Status'], body, meta['Encoding'] \
+                                  , meta['Headers'], True)
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if meta is not None:
+            if 'ETag' in meta['Headers']:
+                headers['If-None-Match'] = meta['Headers']['ETag']
+            if 'Last-Modified' in meta['Headers']:
+                headers['If-Modified-Since'] = meta['Headers']['Last-Modified']
+
+        r = session.request(method, url, headers = headers, **kwargs)
+
+        if r.status_code == 304 and meta is not None:
+            meta['Stored'] = time()
+            self.__store(key, meta, body)
+            return CachedResponse(meta['URL'], meta['Status'], body, meta['Encoding'] \
+                                  , meta['Headers'], True)
+
+        # same decoding as requests.Response.text
+        encoding = r.encoding or r.apparent_encoding
+        response = CachedResponse(str(r.url), r.status_code, r.content, encoding \
+                                  , {k : r.headers[k] for k in PageCache.__kept if k in r.headers}, False)
+
+        if r.status_code == 200:
+            meta = dict()
+            meta['URL'] = response.url
+            meta['Status'] = response.status_code
+            meta['Encoding'] = encoding
+            meta['Headers'] = response.headers
+            meta['Stored'] = time()
+            self.__store(key, meta, response.content)
+
+        return response
+
+    def clear(self):
+        with self.__lock:
+            keys = list(self.__index.keys())
+            self.__index = dict()
+
+        for key in keys:
+            for fname in self.__files(key):
+                if p_exists(fname):
+                    o_remove(fname)
+
+#==============================================================================
+
+class CachedSession:
+
+    """
+        Wraps a logged in session. get and post without form data are served
+        by the cache, everything else goes straight to the wrapped session.
+    """
+    def __init__(self, session, cache : PageCache, scope = ''):
+        self.__session = session
+        self.__cache = cache
+        self.__scope = scope
+
+    def __getattr__(self, name):
+        return getattr(self.__session, name)
+
+    def get(self, url, **kwargs):
+        if kwargs.get('stream', False):
+            return self.__session.get(url, **kwargs)
+        return self.__cache.fetch(self.__session, 'GET', url, self.__scope, **kwargs)
+
+    def post(self, url, data = None, **kwargs):
+        if data is not None:
+            return self.__session.post(url, data = data, **kwargs)
+        return self.__cache.fetch(self.__session, 'POST', url, self.__scope, **kwargs)
+
+#==============================================================================
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:41:12 2026
+
+Lists the members of the submitted archives without extracting them. Only
+the archive directories are read (zip central directory, tar headers, rar
+listing), so a whole sheet is inspected in seconds.
+
+    python manifest.py <sheetNr>   - index 1_Modificated and print a summary
+
+@author: ctoffer
+"""
+
+import sys
+
+from os.path import basename
+from os.path import getsize as p_getsize
+from tarfile import open as taropen
+from zipfile import ZipFile
+
+from util import parallelMap, lazyImport
+
+rarfile = lazyImport('rarfile')
+
+#==============================================================================
+
+MEMBER_KEYS = ['Mail', 'Archive', 'Member', 'Size', 'Packed', 'Ratio', 'CRC']
+SUMMARY_KEYS = ['Mail', 'Archive', 'Members', 'KiB', 'Packed KiB', 'Ratio', 'Flags']
+
+HUGE_SIZE = 50 << 20     # unpacked bytes of an archive
+BOMB_RATIO = 100.0       # unpacked / packed of a single member
+
+#------------------------------------------------------------------------------
+
+def zipMembers(path):
+    with ZipFile(path, 'r') as z:
+        return [(i.filename, i.file_size, i.compress_size, '%08x' % i.CRC) \
+                for i in z.infolist() if not i.is_dir()]
+
+def rarMembers(path):
+    with rarfile.RarFile(path, 'r') as r:
+        return [(i.filename, i.file_size, i.compress_size, '%08x' % i.CRC) \
+                for i in r.infolist() if not i.is_dir()]
+
+def tarMembers(path, mode):
+    # tar keeps neither per member compressed sizes nor checksums of the data
+    with taropen(path, mode) as t:
+        return [(i.name, i.size, None, None) for i in t.getmembers() if i.isfile()]
+
+LISTERS = {'tar.gz' : lambda path : tarMembers(path, 'r:gz'),
+           'tar' : lambda path : tarMembers(path, 'r:'),
+           'zip' : zipMembers,
+           'rar' : rarMembers
+          }
+
+#------------------------------------------------------------------------------
+
+def listMembers(path):
+    """ [(name, size, packed size or None, crc or None)] of the archive path """
+    for extension, lister in LISTERS.items():
+        if path.endswith(extension):
+            return lister(path)
+    raise ValueError('Unsupported archive %s' % basename(path))
+
+def ratioOf(size, packed):
+    return size / packed if packed else 0.0
+
+#==============================================================================
+
+class Manifest:
+
+    """
+        Members of the archive of one submission and the flags derived from
+        them. error is set if the directory could not be read.
+    """
+    def __init__(self, mail, path, members, error = None):
+        self.__mail = mail
+        self.__path = path
+        self.__members = members
+        self.__error = error
+
+    @property
+    def mail(self):
+        return self.__mail
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def members(self):
+        return self.__members
+
+    @property
+    def error(self):
+        return self.__error
+
+    @property
+    def size(self):
+        return sum(size for _, size, _, _ in self.__members)
+
+    @property
+    def packed(self):
+        # tar.gz only knows the size of the whole archive
+        if any(packed is None for _, _, packed, _ in self.__members):
+            return p_getsize(self.__path)
+        return sum(packed for _, _, packed, _ in self.__members)
+
+    @property
+    def flags(self):
+        if self.__error is not None:
+            return ['BROKEN']
+
+        flags = []
+        if len(self.__members) == 0:
+            flags.append('EMPTY')
+        if self.size > HUGE_SIZE:
+            flags.append('HUGE')
+        if any(ratioOf(size, packed) > BOMB_RATIO for _, size, packed, _ in self.__members):
+            flags.append('RATIO')
+        return flags
+
+    #--------------------------------------------------------------------------
+
+    def memberRows(self):
+        rows = []
+        for name, size, packed, crc in self.__members:
+            row = dict()
+            row['Mail'] = self.__mail
+            row['Archive'] = basename(self.__path)
+            row['Member'] = name
+            row['Size'] = str(size)
+            row['Packed'] = '' if packed is None else str(packed)
+            row['Ratio'] = '' if packed is None else '%.1f' % ratioOf(size, packed)
+            row['CRC'] = '' if crc is None else crc
+            rows.append(row)
+        return rows
+
+    def summaryRow(self):
+        row = dict()
+        row['Mail'] = self.__mail
+        row['Archive'] = basename(self.__path)
+        row['Members'] = str(len(self.__members))
+        row['KiB'] = str(self.size // 1024)
+        row['Packed KiB'] = str(self.packed // 1024) if self.__error is None else ''
+        row['Ratio'] = '%.1f' % ratioOf(self.size, self.packed) if self.__error is None else ''
+        row['Flags'] = ' '.join(self.flags) if self.__error is None else 'BROKEN ' + self.__error
+        return row
+
+#------------------------------------------------------------------------------
+
+def readManifests(lsubms, workers = 4):
+    """ The Manifest of every LocalSubmission, in the order of lsubms """
+    results = parallelMap(lambda lsubm : listMembers(lsubm.path), lsubms, workers = workers)
+
+    manifests = []
+    for lsubm, members, error in results:
+        if error is None:
+            manifests.append(Manifest(lsubm.subm.mail, lsubm.path, members))
+        else:
+            manifests.append(Manifest(lsubm.subm.mail, lsubm.path, [], '%s: %s' % (type(error).__name__, error)))
+    return manifests
+
+#==============================================================================
+
+if __name__ == '__main__':
+    from folder import SubmissionFolder
+    from util import DataTable
+
+    if len(sys.argv) < 2:
+        print('Usage: python manifest.py <sheetNr>')
+        sys.exit(1)
+
+    folder = SubmissionFolder(sheetNr = int(sys.argv[1]))
+    manifests = folder.buildManifest()
+    if manifests is None:
+        print('No local submissions for this sheet')
+        sys.exit(1)
+
+    DataTable(SUMMARY_KEYS, manifests, to_dict = Manifest.summaryRow).printToStream()
+
+#==============================================================================
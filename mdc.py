@@ -10,24 +10,51 @@ import json
 
 from os.path import exists as p_exists
 from os.path import join as p_join
+from os.path import dirname as p_dirname
+from os import environ as o_environ
 from os import getcwd as o_getcwd
 from os import makedirs as o_mkdirs
+from os import stat as o_stat
+from threading import Lock
+from time import strftime
 
 from moodle import MoodleAccount, Moodle, MoodleCourse
 from muesli import MuesliAcc, Muesli, Tutorial
 
 from util import ListChoice, DataTable
-from student import Student, NameComparator
+from httpcache import PageCache
+from sessionstore import SessionStore
+from mdstore import SqliteStore, STORE_NAME, tidOf
+from student import Student, StudentFilter, RosterDiff
+
+#==============================================================================
+
+MUESLI_WORKERS = 8
+
+# TUTORIAL_KEEP_SESSION=1 keeps the logins for the next run instead of logging out
+KEEP_SESSION = o_environ.get('TUTORIAL_KEEP_SESSION', '') not in ('', '0')
+
+#==============================================================================
+
+def metricsPath(mdataPath, name):
+    """
+        File for the request metrics of a Moodle or MÜSLI session, name is
+        the command (e.g. muesli-sync). Every run gets its own file.
+    """
+    folder = p_join(mdataPath, "metrics")
+    o_mkdirs(folder, exist_ok = True)
+    return p_join(folder, "%s-%s.json" % (name, strftime("%Y%m%d-%H%M%S")))
 
 #==============================================================================
 
-from pip import main as pip_main
 from importlib.util import find_spec
 
 def install (module):
     spam_spec = find_spec(module)
     found = spam_spec is not None
     if not found:
+        # pip is only needed if something is missing
+        from pip import main as pip_main
         pip_main(['install', module])
 
 #==============================================================================
@@ -74,8 +101,12 @@ def syncMuesliData(accPath, tutPath, stuPath):
     legacy = input("List legacy tutorials? [Y|n]") == 'Y'
             
     mAcc = getAccount(accPath, "MÜSLI", MuesliAcc.fromJsonString)
-    with Muesli(acc = mAcc) as muesli:
-        tuts = muesli.getAllTutorials(legacy)
+    cache = PageCache(p_join(p_dirname(accPath), "cache"))
+    sessions = SessionStore(p_join(p_dirname(accPath), "sessions.json"))
+    metrics = metricsPath(p_dirname(accPath), "muesli-sync")
+    with Muesli(acc = mAcc, cache = cache, sessions = sessions, metrics = metrics
+                , keepSession = KEEP_SESSION) as muesli:
+        tuts = muesli.getAllTutorials(legacy, workers = MUESLI_WORKERS)
         selected = []
         
         for tut in tuts:
@@ -91,12 +122,58 @@ def syncMuesliData(accPath, tutPath, stuPath):
             d.printToStream(stream = fp)
                     
         # write students information
-        students = muesli.getAllStudents(selected)
+        students = muesli.getAllStudents(selected, workers = MUESLI_WORKERS)
         stuTab = DataTable(Student.keys(), students , to_dict = Student.to_dict)
         with open(stuPath, 'w', encoding = 'utf-8') as fp:
             stuTab.printToStream(stream = fp)
             
     return
+
+def refreshRoster(accPath, tutPath, stuPath):
+    """
+        Fetches the student tables of the synced tutorials again and applies
+        only the differences (keyed by mail) to the stored roster.
+    """
+    mdataPath = p_dirname(accPath)
+    storePath = p_join(mdataPath, STORE_NAME)
+    store = SqliteStore(storePath) if p_exists(storePath) else None
+    
+    tuts = store.getTutorials() if store is not None \
+           else DataTable.readFromFile(tutPath, Tutorial.fromDict)
+    old = store.getStudents() if store is not None \
+          else DataTable.readFromFile(stuPath, Student.fromDict)
+    
+    selected = tuts
+    if input("Refresh all %i tutorials? [Y|n]" % len(tuts)) != 'Y':
+        selected = []
+        for tut in tuts:
+            print("Want to refresh this tutorial: ")
+            print(tut.day, tut.time, tut.subject, '(%s)' % tut.room)
+            if input("Type [Y/n]") == 'Y':
+                selected.append(tut)
+    
+    mAcc = getAccount(accPath, "MÜSLI", MuesliAcc.fromJsonString)
+    sessions = SessionStore(p_join(mdataPath, "sessions.json"))
+    metrics = metricsPath(mdataPath, "muesli-refresh")
+    with Muesli(acc = mAcc, sessions = sessions, metrics = metrics
+                , keepSession = KEEP_SESSION) as muesli:
+        new = muesli.getAllStudents(selected, workers = MUESLI_WORKERS)
+    
+    diff = RosterDiff(old, new, [tidOf(tut.day, tut.time) for tut in selected])
+    for line in diff.report():
+        print(line)
+    print("Added %i, removed %i, moved %i, changed %i" \
+          % (len(diff.added), len(diff.removed), len(diff.moved), len(diff.changed)))
+    
+    if store is not None:
+        store.applyRosterDiff(diff)
+        store.close()
+    elif not diff.isEmpty():
+        stuTab = DataTable(Student.keys(), diff.apply(old), to_dict = Student.to_dict)
+        with open(stuPath, 'w', encoding = 'utf-8') as fp:
+            stuTab.printToStream(stream = fp)
+    
+    return diff
             
 #------------------------------------------------------------------------------
 
@@ -104,7 +181,11 @@ def navigateMoodle(accPath, coursePath):
     legacy = input('Wanna selected from old semester? [Y|n]') == 'Y'
     
     mAcc = getAccount(accPath, "MOODLE", MoodleAccount.fromJsonString)
-    with Moodle(acc = mAcc) as moodle:
+    cache = PageCache(p_join(p_dirname(accPath), "cache"))
+    sessions = SessionStore(p_join(p_dirname(accPath), "sessions.json"))
+    metrics = metricsPath(p_dirname(accPath), "moodle-navigate")
+    with Moodle(acc = mAcc, cache = cache, sessions = sessions, metrics = metrics
+                , keepSession = KEEP_SESSION) as moodle:
         semesterURL = None
         
         if legacy:
@@ -136,6 +217,7 @@ if __name__ == '__main__':
     print("Installing additional modules...", end = '')
     install('bs4')
     install('requests')
+    install('aiohttp')
     install('zipfile')
     install('rarfile')
     install('tarfile')
@@ -174,8 +256,8 @@ if __name__ == '__main__':
     if not p_exists(tutPath):        
         print("Select tutoials to sync - connecting to MUESLI")
         syncMuesliData(accPath, tutPath, stuPath)
-    else:
-        print("Tutorials and students already present")
+    elif input("Tutorials and students already present - refresh roster? [Y|n]") == 'Y':
+        refreshRoster(accPath, tutPath, stuPath)
             
     #----------------------------------------------------------------------
         
@@ -199,20 +281,64 @@ if __name__ == '__main__':
 
 class MetaData:
     
-    def __init__(self, root = None):
+    """
+        Every MetaData file is loaded once and kept in memory, keyed by its
+        path. A file is reloaded as soon as its mtime or size changes, so
+        edits and re-syncs are picked up without restarting.
+    """
+    __files = dict()
+    __lock = Lock()
+    
+    def __init__(self, root = None, store = None):
         if root is None:
             root = o_getcwd()
             
         self.__root = root
         self.__mdataPath = p_join(root, "MetaData")
-        self.__name_cmp = NameComparator()
+        
+        # the SQLite store replaces the .table files once it was imported
+        if store is None and p_exists(p_join(self.__mdataPath, STORE_NAME)):
+            store = SqliteStore(p_join(self.__mdataPath, STORE_NAME))
+        self.__store = store
+        
+    @property
+    def store(self):
+        return self.__store
    
     #--------------------------------------------------------------------------
+    
+    def __entry(self, fname, loader):
+        path = p_join(self.__mdataPath, fname)
+        stat = o_stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        
+        with MetaData.__lock:
+            entry = MetaData.__files.get(path)
+            if entry is None or entry['Stamp'] != stamp:
+                entry = {'Stamp' : stamp, 'Value' : loader(path), 'Derived' : dict()}
+                MetaData.__files[path] = entry
+            return entry
+    
+    def __load(self, fname, loader):
+        return self.__entry(fname, loader)['Value']
+    
+    def __derive(self, fname, loader, name, build):
+        # values computed from a file live exactly as long as its content
+        entry = self.__entry(fname, loader)
+        with MetaData.__lock:
+            if name not in entry['Derived']:
+                entry['Derived'][name] = build(entry['Value'])
+            return entry['Derived'][name]
+    
+    @staticmethod
+    def invalidate():
+        with MetaData.__lock:
+            MetaData.__files.clear()
+    
+    #--------------------------------------------------------------------------
      
     def getAccount(self, accName, from_dict):
-        accPath = p_join(self.__mdataPath, "accounts.json")
-        with open(accPath, 'r', encoding = 'utf-8') as fp:
-            return from_dict(json.load(fp)[accName])
+        return from_dict(self.__load("accounts.json", loadJson)[accName])
         
     def getMuesliAcc(self):
         return self.getAccount('MÜSLI', MuesliAcc.fromDict)
@@ -221,44 +347,81 @@ class MetaData:
         return self.getAccount('MOODLE', MoodleAccount.fromDict)
     
     def getTutorLastname(self):
-        tutData = p_join(self.__mdataPath, "tutordata.json")
-        with open(tutData, 'r', encoding = 'utf-8') as fp:
-            return json.load(fp)['Lastname']
+        return self.__load("tutordata.json", loadJson)['Lastname']
     
     #--------------------------------------------------------------------------
     
     def getSyncedTutorials(self):
-        tutPath = p_join(self.__mdataPath, "tutorials.table")
-        return DataTable.readFromFile(tutPath, Tutorial.fromDict)
+        if self.__store is not None:
+            return self.__store.getTutorials()
+        loader = lambda path : DataTable.readFromFile(path, Tutorial.fromDict)
+        return list(self.__load("tutorials.table", loader))
     
     def getTIDs(self):
+        if self.__store is not None:
+            return self.__store.getTIDs()
         tuts = self.getSyncedTutorials()
         return list(set([tut.day + "_" + tut.time.replace(":", "-") for tut in tuts]))
     
     #--------------------------------------------------------------------------
     
+    def getPageCache(self):
+        return PageCache(p_join(self.__mdataPath, "cache"))
+    
+    def getSessionStore(self):
+        return SessionStore(p_join(self.__mdataPath, "sessions.json"))
+    
+    def getMetricsPath(self, name):
+        return metricsPath(self.__mdataPath, name)
+    
+    #--------------------------------------------------------------------------
+    
     def getMoodleCourse(self):
-        coursePath = p_join(self.__mdataPath, "course.json")
-        with open(coursePath, 'r', encoding = 'utf-8') as fp:
-            return MoodleCourse.fromDict(json.load(fp))
+        return MoodleCourse.fromDict(self.__load("course.json", loadJson))
     
     #--------------------------------------------------------------------------
     
+    def __roster(self):
+        # (file, loader) of the students, the store file changes on writes too
+        if self.__store is not None:
+            return (STORE_NAME, lambda path : self.__store.getStudents())
+        return ("students.table", loadStudents)
+    
+    def __students(self):
+        return self.__load(*self.__roster())
+    
     def getStudents(self, fil = lambda x : x):
-        studPath = p_join(self.__mdataPath, "students.table")
-        studs = DataTable.readFromFile(studPath, Student.fromDict)
-        return list(filter(fil, studs))
+        return list(filter(fil, self.__students()))
     
     def getStudentsOf(self, tut : Tutorial):
+        if self.__store is not None:
+            return self.__store.getStudentsOfTid(tidOf(tut.day, tut.time))
         fil = lambda x : x.day == tut.day and x.time == tut.time
         return self.getStudents(fil = fil)
     
+    def getStudentFilter(self):
+        return self.__derive(*self.__roster(), 'Filter', StudentFilter)
+    
     def getStudentsByName(self, name : str):
-        return self.getStudents(fil = lambda x : self.__name_cmp(name, x.name))
+        if self.__store is not None:
+            return self.__store.getStudentsByName(name)
+        return self.getStudentFilter().findAll(name)
     
     def getStudentByMail(self, mail):
-        return self.getStudents(fil = lambda x : x.mail == mail)[0]
+        if self.__store is not None:
+            return self.__store.getStudentsByMail(mail)[0]
+        byMail = lambda studs : {stud.mail : stud for stud in reversed(studs)}
+        return self.__derive(*self.__roster(), 'ByMail', byMail)[mail]
     
     #--------------------------------------------------------------------------
         
-        
+#------------------------------------------------------------------------------
+
+def loadJson(path):
+    with open(path, 'r', encoding = 'utf-8') as fp:
+        return json.load(fp)
+    
+def loadStudents(path):
+    return DataTable.readFromFile(path, Student.fromDict)
+
+#==============================================================================
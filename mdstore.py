@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:32:08 2026
+
+SQLite storage for the MetaData tables and the submission stages.
+
+MetaData uses the store as soon as MetaData/metadata.sqlite exists and
+SubmissionFolder then keeps its stage lists in it instead of .table files.
+Students are indexed by mail, escaped name, name parts and TID, so the
+lookups of MetaData are queries instead of file scans.
+
+    python mdstore.py import   - create the store from the .table files
+    python mdstore.py export   - write the .table files from the store
+
+@author: ctoffer
+"""
+
+import sqlite3
+import sys
+
+from glob import glob
+from threading import local
+from os import getcwd as o_getcwd
+from os.path import basename as p_basename
+from os.path import exists as p_exists
+from os.path import join as p_join
+
+from muesli import Tutorial
+from student import Student, NameComparator, escapeName, substrings
+from util import DataTable
+
+#==============================================================================
+
+STORE_NAME = 'metadata.sqlite'
+
+# stage name -> (folder of the sheet, table file)
+STAGES = {'origin'  : ('0_Origin', 'lsubms.table')
+          , 'local'   : ('1_Modificated', 'localsubms.table')
+          , 'working' : ('1_Working', 'working.table')}
+
+SUBM_KEYS = ['Name', 'Mail', 'SubmState', 'Overdue', 'FileURL', 'FileName', 'Path']
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS students (
+    pos INTEGER PRIMARY KEY, name TEXT, mail TEXT, subject TEXT, state TEXT,
+    day TEXT, time TEXT, tutor TEXT, tid TEXT, norm_name TEXT);
+CREATE INDEX IF NOT EXISTS students_mail ON students (mail);
+CREATE INDEX IF NOT EXISTS students_norm_name ON students (norm_name);
+CREATE INDEX IF NOT EXISTS students_tid ON students (tid);
+
+CREATE TABLE IF NOT EXISTS student_parts (part TEXT, pos INTEGER);
+CREATE INDEX IF NOT EXISTS student_parts_part ON student_parts (part);
+CREATE TABLE IF NOT EXISTS student_grams (gram TEXT, pos INTEGER);
+CREATE INDEX IF NOT EXISTS student_grams_gram ON student_grams (gram);
+
+CREATE TABLE IF NOT EXISTS tutorials (
+    pos INTEGER PRIMARY KEY, subject TEXT, day TEXT, time TEXT, tutor TEXT,
+    room TEXT, state TEXT, url TEXT, tid TEXT);
+CREATE INDEX IF NOT EXISTS tutorials_tid ON tutorials (tid);
+
+CREATE TABLE IF NOT EXISTS submissions (
+    sheet INTEGER, stage TEXT, pos INTEGER, name TEXT, mail TEXT,
+    subm_state TEXT, overdue TEXT, file_url TEXT, file_name TEXT, path TEXT);
+CREATE INDEX IF NOT EXISTS submissions_stage ON submissions (sheet, stage, pos);
+CREATE INDEX IF NOT EXISTS submissions_mail ON submissions (sheet, stage, mail);
+
+-- a stored stage may be empty, its presence is kept apart from its rows
+CREATE TABLE IF NOT EXISTS stages (sheet INTEGER, stage TEXT, PRIMARY KEY (sheet, stage));
+INSERT OR IGNORE INTO stages SELECT DISTINCT sheet, stage FROM submissions;
+'''
+
+GRAM = 3
+
+#------------------------------------------------------------------------------
+
+def tidOf(day, time):
+    return day + "_" + time.replace(":", "-")
+
+#==============================================================================
+
+class SqliteStore:
+
+    def __init__(self, path):
+        self.__path = path
+        self.__local = local()
+        self.__db.executescript(SCHEMA)
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def __db(self):
+        # sqlite connections must not be shared between threads
+        db = getattr(self.__local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.__path)
+            self.__local.db = db
+        return db
+
+    #--------------------------------------------------------------------------
+
+    def __enter__ (self):
+        return self
+
+    def __exit__ (self, type, value, traceback):
+        self.close()
+
+    def close(self):
+        db = getattr(self.__local, 'db', None)
+        if db is not None:
+            db.close()
+            self.__local.db = None
+
+    #--------------------------------------------------------------------------
+
+    @staticmethod
+    def __toStudent(row):
+        name, mail, subject, state, day, time, tutor = row
+        return Student(name, mail, subject, day, time, tutor, state)
+
+    def __students(self, where = '', args = ()):
+        cols = 'name, mail, subject, state, day, time, tutor'
+        query = 'SELECT %s FROM students %s ORDER BY pos' % (cols, where)
+        return [SqliteStore.__toStudent(row) for row in self.__db.execute(query, args)]
+
+    def putStudents(self, students):
+        with self.__db:
+            self.__db.execute('DELETE FROM students')
+            self.__db.execute('DELETE FROM student_parts')
+            self.__db.execute('DELETE FROM student_grams')
+
+            self.__insertStudents(0, students)
+
+    def __insertStudents(self, first, students):
+        for pos, s in enumerate(students, first):
+            parts = escapeName(s.name)
+            self.__db.execute('INSERT INTO students VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+                              , (pos, s.name, s.mail, s.subject, s.state, s.day, s.time
+                                 , s.tutor, tidOf(s.day, s.time), ' '.join(parts)))
+
+            parts = set(part for part in parts if part != '')
+            self.__db.executemany('INSERT INTO student_parts VALUES (?, ?)'
+                                  , [(part, pos) for part in parts])
+            grams = set(gram for part in parts for gram in substrings(part, GRAM))
+            self.__db.executemany('INSERT INTO student_grams VALUES (?, ?)'
+                                  , [(gram, pos) for gram in grams])
+
+    def applyRosterDiff(self, diff):
+        """ Applies a student.RosterDiff, updated students keep their position """
+        with self.__db:
+            for stud in diff.removed:
+                for pos in self.__positionsOf(stud.mail):
+                    self.__deleteStudent(pos)
+
+            for stud in diff.updated:
+                for pos in self.__positionsOf(stud.mail):
+                    self.__deleteStudent(pos)
+                    self.__insertStudents(pos, [stud])
+
+            last, = self.__db.execute('SELECT COALESCE(MAX(pos), -1) FROM students').fetchone()
+            self.__insertStudents(last + 1, diff.added)
+
+    def __positionsOf(self, mail):
+        return [pos for pos, in self.__db.execute('SELECT pos FROM students WHERE mail = ?', (mail,)).fetchall()]
+
+    def __deleteStudent(self, pos):
+        self.__db.execute('DELETE FROM students WHERE pos = ?', (pos,))
+        self.__db.execute('DELETE FROM student_parts WHERE pos = ?', (pos,))
+        self.__db.execute('DELETE FROM student_grams WHERE pos = ?', (pos,))
+
+    def getStudents(self):
+        return self.__students()
+
+    def getStudentsByMail(self, mail):
+        return self.__students('WHERE mail = ?', (mail,))
+
+    def getStudentsOfTid(self, tid):
+        return self.__students('WHERE tid = ?', (tid,))
+
+    def __candidates(self, part):
+        # students with a name part containing part or contained in it
+        subs = list(substrings(part))
+        query = 'SELECT pos FROM student_parts WHERE part IN (%s)' % ', '.join('?' * len(subs))
+        found = set(pos for pos, in self.__db.execute(query, subs))
+
+        if len(part) <= GRAM:
+            query = 'SELECT pos FROM student_grams WHERE gram = ?'
+            found |= set(pos for pos, in self.__db.execute(query, (part,)))
+        else:
+            grams = list(set(part[i:i + GRAM] for i in range(len(part) - GRAM + 1)))
+            query = 'SELECT pos FROM student_grams WHERE gram IN (%s) ' % ', '.join('?' * len(grams)) \
+                    + 'GROUP BY pos HAVING COUNT(DISTINCT gram) = ?'
+            found |= set(pos for pos, in self.__db.execute(query, grams + [len(grams)]))
+
+        return found
+
+    def getStudentsByName(self, name):
+        parts = escapeName(name)
+        found = set()
+        for part in parts:
+            if part != '':
+                found |= self.__candidates(part)
+
+        if len(found) == 0:
+            return []
+
+        cols = 'pos, norm_name, name, mail, subject, state, day, time, tutor'
+        query = 'SELECT %s FROM students WHERE pos IN (%s) ORDER BY pos' \
+                % (cols, ', '.join('?' * len(found)))
+        rows = self.__db.execute(query, list(found))
+
+        return [SqliteStore.__toStudent(row[2:]) for row in rows \
+                if NameComparator.matchParts(tuple(row[1].split(' ')), parts)]
+
+    #--------------------------------------------------------------------------
+
+    def putTutorials(self, tutorials):
+        with self.__db:
+            self.__db.execute('DELETE FROM tutorials')
+            self.__db.executemany('INSERT INTO tutorials VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)'
+                                  , [(pos, t.subject, t.day, t.time, t.tutor, t.room, t.state
+                                      , t.url, tidOf(t.day, t.time)) for pos, t in enumerate(tutorials)])
+
+    def getTutorials(self):
+        query = 'SELECT subject, day, time, room, url, tutor, state FROM tutorials ORDER BY pos'
+        return [Tutorial(*row) for row in self.__db.execute(query)]
+
+    def getTIDs(self):
+        return [tid for tid, in self.__db.execute('SELECT DISTINCT tid FROM tutorials')]
+
+    #--------------------------------------------------------------------------
+
+    def putSubmissions(self, sheetNr, stage, rows):
+        """ rows are dicts with (a subset of) SUBM_KEYS, e.g. LocalSubmission.toDict """
+        with self.__db:
+            self.__db.execute('DELETE FROM submissions WHERE sheet = ? AND stage = ?', (sheetNr, stage))
+            self.__db.execute('INSERT OR IGNORE INTO stages VALUES (?, ?)', (sheetNr, stage))
+            self.__db.executemany('INSERT INTO submissions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+                                  , [(sheetNr, stage, pos) + tuple(row.get(k) for k in SUBM_KEYS) \
+                                     for pos, row in enumerate(rows)])
+
+    def getSubmissions(self, sheetNr, stage):
+        """ The rows as dicts ([] for an empty stage) or None if the stage was never stored """
+        stored = self.__db.execute('SELECT 1 FROM stages WHERE sheet = ? AND stage = ?', (sheetNr, stage))
+        if stored.fetchone() is None:
+            return None
+
+        query = 'SELECT name, mail, subm_state, overdue, file_url, file_name, path ' \
+                + 'FROM submissions WHERE sheet = ? AND stage = ? ORDER BY pos'
+        return [dict(zip(SUBM_KEYS, row)) for row in self.__db.execute(query, (sheetNr, stage))]
+
+    def getSubmission(self, sheetNr, stage, mail):
+        query = 'SELECT name, mail, subm_state, overdue, file_url, file_name, path ' \
+                + 'FROM submissions WHERE sheet = ? AND stage = ? AND mail = ? ORDER BY pos LIMIT 1'
+        row = self.__db.execute(query, (sheetNr, stage, mail)).fetchone()
+        return None if row is None else dict(zip(SUBM_KEYS, row))
+
+    def updateSubmissionPath(self, sheetNr, stage, mail, path):
+        with self.__db:
+            self.__db.execute('UPDATE submissions SET path = ? WHERE sheet = ? AND stage = ? AND mail = ?'
+                              , (path, sheetNr, stage, mail))
+
+    def getSheets(self):
+        return [nr for nr, in self.__db.execute('SELECT DISTINCT sheet FROM stages ORDER BY sheet')]
+
+#==============================================================================
+
+def importTables(root, store : SqliteStore):
+    mdataPath = p_join(root, 'MetaData')
+
+    store.putTutorials(DataTable.readFromFile(p_join(mdataPath, 'tutorials.table'), Tutorial.fromDict))
+    store.putStudents(DataTable.readFromFile(p_join(mdataPath, 'students.table'), Student.fromDict))
+    print('Imported tutorials and students')
+
+    for sheetPath in sorted(glob(p_join(root, 'Blatt_*'))):
+        sheetNr = int(p_basename(sheetPath).split('_')[1])
+
+        for stage, (folder, table) in STAGES.items():
+            tablePath = p_join(sheetPath, folder, table)
+            if p_exists(tablePath):
+                store.putSubmissions(sheetNr, stage, DataTable.readFromFile(tablePath))
+                print('Imported', tablePath)
+
+def exportTables(root, store : SqliteStore):
+    mdataPath = p_join(root, 'MetaData')
+
+    cols = ["Subject", "Day", "Time", "Tutor", "Room", "State", "URL"]
+    with open(p_join(mdataPath, 'tutorials.table'), 'w', encoding = 'utf-8') as fp:
+        DataTable(cols, store.getTutorials(), to_dict = lambda tut : tut.toDict()).printToStream(fp)
+    with open(p_join(mdataPath, 'students.table'), 'w', encoding = 'utf-8') as fp:
+        DataTable(Student.keys(), store.getStudents(), to_dict = Student.to_dict).printToStream(fp)
+    print('Exported tutorials and students')
+
+    for sheetNr in store.getSheets():
+        for stage, (folder, table) in STAGES.items():
+            rows = store.getSubmissions(sheetNr, stage)
+            if rows is None:
+                continue
+
+            tablePath = p_join(root, 'Blatt_%s' % str(sheetNr).zfill(2), folder, table)
+            cols = ['Path'] if stage == 'working' else SUBM_KEYS
+            with open(tablePath, 'w', encoding = 'utf-8') as fp:
+                DataTable(cols, rows, to_dict = lambda row : {k : row[k] or '' for k in cols}).printToStream(fp)
+            print('Exported', tablePath)
+
+#==============================================================================
+
+if __name__ == '__main__':
+    root = o_getcwd()
+    command = sys.argv[1] if len(sys.argv) > 1 else ''
+
+    if command not in ['import', 'export']:
+        print('Usage: python mdstore.py [import|export]')
+        sys.exit(1)
+
+    with SqliteStore(p_join(root, 'MetaData', STORE_NAME)) as store:
+        if command == 'import':
+            importTables(root, store)
+        else:
+            exportTables(root, store)
+
+#==============================================================================
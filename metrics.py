@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:15:37 2026
+
+Counts, bytes, status codes and latencies of the requests of a Transport,
+grouped by endpoint. Endpoints are method and path with the numbers
+replaced, so /course/view.php?id=12 and ?id=13 are one endpoint and the
+pluginfile downloads are another.
+
+@author: ctoffer
+"""
+
+import json
+
+from re import compile as rcompile
+from threading import Lock
+from urllib.parse import urlsplit
+
+#==============================================================================
+
+# upper bounds in ms, the last bucket takes the rest
+BUCKETS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+NUMBER = rcompile(r'^\d+$')
+
+#------------------------------------------------------------------------------
+
+def endpointOf(method, url):
+    parts = urlsplit(url)
+    segments = parts.path.split('/')
+
+    # everything behind pluginfile.php names the file of one submission
+    if 'pluginfile.php' in segments:
+        segments = segments[:segments.index('pluginfile.php') + 1] + ['*']
+
+    path = '/'.join('{n}' if NUMBER.match(s) else s for s in segments)
+    return '%s %s%s' % (method.upper(), parts.netloc, path)
+
+def percentile(values, p):
+    """ Nearest rank percentile of the sorted values """
+    if len(values) == 0:
+        return None
+    rank = max(int(round(p / 100 * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+#==============================================================================
+
+class RequestMetrics:
+
+    def __init__(self):
+        self.__endpoints = dict()
+        self.__lock = Lock()
+
+    def record(self, method, url, status, nbytes, seconds):
+        """ status is the HTTP status or the name of the raised exception """
+        key = endpointOf(method, url)
+        ms = seconds * 1000
+
+        with self.__lock:
+            entry = self.__endpoints.get(key)
+            if entry is None:
+                entry = {'Count' : 0, 'Bytes' : 0, 'Status' : dict()
+                         , 'Latencies' : [], 'Buckets' : [0] * (len(BUCKETS) + 1)}
+                self.__endpoints[key] = entry
+
+            entry['Count'] += 1
+            entry['Bytes'] += nbytes or 0
+            entry['Status'][str(status)] = entry['Status'].get(str(status), 0) + 1
+            entry['Latencies'].append(ms)
+            entry['Buckets'][sum(1 for bound in BUCKETS if ms > bound)] += 1
+
+    #--------------------------------------------------------------------------
+
+    def snapshot(self):
+        """ {endpoint : {Count, Bytes, Status, Buckets, p50, p95, p99, Max, Total} in ms } """
+        result = dict()
+        with self.__lock:
+            for key, entry in self.__endpoints.items():
+                latencies = sorted(entry['Latencies'])
+                result[key] = {'Count' : entry['Count']
+                               , 'Bytes' : entry['Bytes']
+                               , 'Status' : dict(entry['Status'])
+                               , 'Buckets' : dict(zip(['<=%i' % b for b in BUCKETS] + ['>%i' % BUCKETS[-1]]
+                                                      , entry['Buckets']))
+                               , 'p50' : percentile(latencies, 50)
+                               , 'p95' : percentile(latencies, 95)
+                               , 'p99' : percentile(latencies, 99)
+                               , 'Max' : latencies[-1]
+                               , 'Total' : sum(latencies)}
+        return result
+
+    @property
+    def requests(self):
+        with self.__lock:
+            return sum(entry['Count'] for entry in self.__endpoints.values())
+
+    @property
+    def bytes(self):
+        with self.__lock:
+            return sum(entry['Bytes'] for entry in self.__endpoints.values())
+
+    def summaryRows(self):
+        """ One row per endpoint for a DataTable, the slowest (by total time) first """
+        rows = []
+        for key, entry in sorted(self.snapshot().items(), key = lambda item : -item[1]['Total']):
+            row = dict()
+            row['Endpoint'] = key
+            row['Count'] = str(entry['Count'])
+            row['KiB'] = str(entry['Bytes'] // 1024)
+            row['Status'] = ' '.join('%s:%i' % item for item in sorted(entry['Status'].items()))
+            for p in ['p50', 'p95', 'p99']:
+                row[p + ' ms'] = '%.1f' % entry[p]
+            rows.append(row)
+        return rows
+
+    def dump(self, path):
+        with open(path, 'w', encoding = 'utf-8') as fp:
+            json.dump(self.snapshot(), fp, indent = 4, sort_keys = True)
+
+#==============================================================================
+
+SUMMARY_KEYS = ['Endpoint', 'Count', 'KiB', 'Status', 'p50 ms', 'p95 ms', 'p99 ms']
+
+#==============================================================================
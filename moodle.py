@@ -13,22 +13,37 @@ Module with everything about Moodle, including:
     MoodleCourse       - Contains MetaData like Fac, SubFac and a direct link
     
     MoodleCI           - Console Interface
+    
+    parse*             - html parsing, shared with AsyncMoodle (amoodle.py)
 
     MoodleCourse#__prepareFilterOnSite -> modify the pattern of the folder
 
 @author: ctoffer
 """
 
-from bs4 import BeautifulSoup
+from htmlparse import makeSoup, SoupStrainer
 from re import compile as rcompile
+from re import escape as rescape
+from codecs import getincrementaldecoder
+from html.parser import HTMLParser
 from os.path import join as pjoin
 from os.path import exists as pexists
+from os.path import getsize as pgetsize
 from os import makedirs as omakedirs
-from requests import Session
-import requests
+from os import replace as oreplace
 
-from util import Cipher
+from util import Cipher, DataTable, SessionPool, parallelMap, lazyImport
+from transfer import StreamWriter
+import tracing
+from httpcache import CachedSession
+from metrics import SUMMARY_KEYS
 import json
+from time import perf_counter, sleep
+
+requests = lazyImport('requests')
+urllib3 = lazyImport('urllib3')
+
+MOODLE_URL = 'https://elearning2.uni-heidelberg.de'
 
 #==============================================================================
 
@@ -78,6 +93,7 @@ class MoodleSubmission:
         self.__overdue = overdue
         self.__fURL = fileURL
         self.__fName = fileName
+        self.__transfer = None
         
     @property
     def name(self):
@@ -103,6 +119,11 @@ class MoodleSubmission:
     def fileName(self):
         return self.__fName
     
+    @property
+    def transfer(self):
+        """ TransferReport of the last download or None """
+        return self.__transfer
+    
     def __str__(self):
         return str((self.name, self.mail, self.submState, self.overdue, self.fileURL, self.fileName))
     
@@ -129,24 +150,89 @@ class MoodleSubmission:
     
     #==========================================================================
     
-    def download(self, session, dest):
-        print('Downloading submission of %s in %s...' % (self.name, pjoin(dest, self.fileName)), end = '', flush = True)
-        r = session.get(self.fileURL, stream = True)
+    def download(self, session, dest, writer = None):
+        """
+            Downloads the submission into dest. The data is written into
+            <fileName>.part first and only renamed when it is complete, so a
+            broken download is resumed with a Range request next time.
+            A Transport session resumes a connection lost mid-transfer right
+            away, as long as its retries allow.
+        """
+        attempt = 0
+        while True:
+            try:
+                with tracing.span('download', cat = 'submission', student = self.name, attempt = attempt):
+                    return self.__download(session, dest, writer)
+            # StreamWriter reads response.raw, which raises the urllib3 errors
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout
+                    , requests.exceptions.ChunkedEncodingError
+                    , urllib3.exceptions.ProtocolError, urllib3.exceptions.ReadTimeoutError) as e:
+                delay = session.retryDelay(attempt) if hasattr(session, 'retryDelay') else None
+                if delay is None:
+                    raise
+                print('Resume submission of %s in %.1f s - %s' % (self.name, delay, type(e).__name__))
+                sleep(delay)
+                attempt += 1
+    
+    def __download(self, session, dest, writer):
+        archivePath = pjoin(dest, self.fileName)
+        partPath = archivePath + '.part'
+        omakedirs(dest, exist_ok = True)
+        
+        offset = pgetsize(partPath) if pexists(partPath) else 0
+        r = self.__request(session, offset)
+        
+        # the part is already complete or does not fit the file anymore
+        if r.status_code == requests.codes.range_not_satisfiable:
+            r.close()
+            offset = 0
+            r = self.__request(session, offset)
+        
+        if r.status_code == requests.codes.partial_content:
+            start, total = parseContentRange(r.headers.get('Content-Range'))
+            if start != offset:
+                raise RuntimeError('Error @ %s - server resumed at byte %s instead of %i' % (self.name, start, offset))
             
-        if r.status_code == requests.codes.ok:
-            if not pexists(dest):
-                omakedirs(dest)
+        elif r.status_code == requests.codes.ok:
+            total = r.headers.get('Content-Length')
+            total = None if total is None else int(total)
+            offset = 0
             
-            archivePath = pjoin(dest, self.fileName)
-                
-            with open(archivePath, 'wb') as f:
-                for chunk in r.iter_content(chunk_size = 128):
-                    f.write(chunk)
-            print('[OK]')
         else:
-            print('Error @ %s - %s' % (self.name, self.fileURL))
+            raise RuntimeError('Error @ %s - %s (HTTP %i)' % (self.name, self.fileURL, r.status_code))
+            
+        writer = writer or StreamWriter()
+        self.__transfer = writer.write(r, partPath, offset, total)
+        
+        size = pgetsize(partPath)
+        if total is not None and size != total:
+            raise RuntimeError('Error @ %s - got %i of %i bytes, resume with the next run' % (self.name, size, total))
+        
+        oreplace(partPath, archivePath)
+        
+        if offset > 0:
+            print('Resumed submission of %s in %s at byte %i [OK] (%s)' % (self.name, archivePath, offset, self.__transfer))
+        else:
+            print('Downloaded submission of %s in %s [OK] (%s)' % (self.name, archivePath, self.__transfer))
         return archivePath
+    
+    def __request(self, session, offset):
+        # identity encoding keeps the byte offsets equal to the file offsets
+        headers = {'Accept-Encoding' : 'identity'}
+        if offset > 0:
+            headers['Range'] = 'bytes=%i-' % offset
+        return session.get(self.fileURL, stream = True, headers = headers)
                 
+#------------------------------------------------------------------------------
+
+def parseContentRange(contentRange):
+    """ 'bytes 200-999/1000' -> (200, 1000), the total is None if unknown """
+    if contentRange is None:
+        return (None, None)
+    
+    span, total = contentRange.split(' ')[-1].split('/')
+    start = int(span.split('-')[0]) if span != '*' else None
+    return (start, None if total == '*' else int(total))
         
 
 #==============================================================================
@@ -190,17 +276,7 @@ class MoodleFacility:
         if self.__subFacs is None:
             # create the list if not present
             r = session.get(self.__url)
-        
-            url = 'https://elearning2\.uni-heidelberg\.de/course/' \
-                    + 'index\.php\?categoryid=\d+$'
-        
-            soup = BeautifulSoup(r.text, 'html.parser')
-            rows = soup.findAll('a', href = rcompile(url), attrs = {'itemprop' : False})
-        
-            get_id = lambda row : row['href'].split('?categoryid=')[1]
-            toSubFac = lambda row : MoodleSubFacility(self, get_id(row), row.text, row['href'])
-            
-            self.__subFacs = [toSubFac(row) for row in rows]
+            self.__subFacs = parseSubFacilities(self, r.text)
         
         return self.__subFacs
 
@@ -252,14 +328,7 @@ class MoodleSubFacility:
         if self.__courses is None:
             # create the list of courses
             r = session.get(self.__url)
-        
-            soup = BeautifulSoup(r.text, 'html.parser')
-            elem = soup.find('div', attrs={'class':'course_category_tree clearfix '})
-            url = 'https://elearning2\.uni-heidelberg\.de/course/' \
-                    + 'view\.php\?id=\d+'
-            rows = elem.findAll('a', href = rcompile(url))
-        
-            self.__courses = [MoodleCourse(self, row.text, row['href']) for row in rows]
+            self.__courses = parseCourses(self, r.text)
         return self.__courses
 
 #==============================================================================
@@ -300,112 +369,18 @@ class MoodleCourse:
     #--------------------------------------------------------------------------
     
     def __prepareFilterOnSite(self, session, sesskey, sheetNr):
-        subMissionURL = None
         r = session.get(self.__url)
+        sheetLink = parseSheetLink(r.text, sheetNr)
+        subMissionURL = parseSubmissionsLink(session.get(sheetLink).text)
         
-        soup = BeautifulSoup(r.text, 'html.parser')
-        anchors = soup.findAll('a', onclick = True, href = True)
-
-        text = 'Übungsblatt %i Aufgabe' % sheetNr
-        fil = lambda x: [a for a in x if text == a.text][0]
-       
-        sheetLink = fil(anchors)['href']
-        
-        if sheetLink == None:
-            raise ValueError('The exercise sheet was not found')
-
-        btnAs = BeautifulSoup(session.get(sheetLink).text, 'html.parser').findAll('a', href=True, attrs={'class':'btn'}, text='Alle Abgaben anzeigen')
-        if len(btnAs) == 1:
-            subMissionURL = btnAs[0]['href']
-            
-        elif len(btnAs) < 1:
-            raise ValueError('No btn found!')
-            
-        else:
-            raise ValueError('Too much btns found!')
-        
-        soup = BeautifulSoup(session.get(subMissionURL).text, 'html.parser')
-        classAttrs = soup.find('body').attrs['class']
-        formData = {}
-        for attr in classAttrs:
-            if 'context-' in attr:
-                formData['contextid'] = attr.split('-')[1]
-            elif 'cmid-' in attr:
-                formData['id'] = attr.split('-')[1]
-                
-  
-        # href contains a link where the userid is  a subsequence of
-        # split the href at '?'. right side contains userid (uid)
-        # pattern of uidElem = id=<num>
-        uidElem = soup.find('a', href = True, attrs = {'class':'icon menu-action', 'role':'menuitem', 'data-title':'profile,moodle'})
-        
-        formData['userid'] = uidElem['href'].split('?')[1].split('=')[1]
-        formData['action'] = 'saveoptions'
-        formData['sesskey'] = sesskey
-        formData['_qf__mod_assign_grading_options_form'] = '1'
-        formData['mform_isexpanded_id_general'] = '0'
-        formData['perpage'] = '-1'
-        formData['downloadasfolders'] = '1'
-        
+        formData = parseFilterForm(session.get(subMissionURL).text, sesskey)
         session.post(subMissionURL, data = formData)
         return subMissionURL
     
     def __getSubmissions(self, url, session, studFilter = None):
-        data = []
-        soup = BeautifulSoup(session.get(url).text , 'html.parser')
+        html = session.get(url).text
         print(url)
-        table = soup.findAll('table', attrs={'class':'flexible generaltable generalbox'})[0]
-        rows = table.findChildren('tr')
-    
-        # Row structure
-        # Cell 0: CheckBox 
-        # Cell 1: Picture
-        # Cell 2: Name                   <<<
-        # Cell 3: E-Mail
-        # Cell 4: State                  <<<
-        # Cell 5: Grade
-        # Cell 6: Edit
-        # Cell 7: Last Modified
-        # Cell 8: Filelink               <<<
-        # Cell 9 - 13: Feedbackstuff
-        
-        for row in rows:
-            name = row.find('td', attrs={'class':'cell c2'})
-            if name != None:
-                name = name.find('a').text
-            else:
-                continue
-            
-            mail = row.find('td', attrs={'class':'cell c3 email'})
-            if mail != None:
-                mail = mail.text
-            
-            date = row.find('td', attrs={'class':'cell c4'})
-            if date == None:
-                continue
-            
-            oDue = date.find('div', attrs={'class':'overduesubmission'})
-            if oDue != None:
-                oDue = oDue.text
-            else:
-                lSub = date.find('div', attrs={'class':'latesubmission'})
-                oDue = '' if lSub is None else lSub.text
-                
-            subState = date.find('div').text
-            
-            submFile = row.find('td', attrs={'class':'cell c8'})
-            if submFile == None:
-                continue
-
-            submFileAnchor = submFile.find('a', href=True)
-            if submFileAnchor == None:
-                continue
-            submFileLink = submFileAnchor['href']
-            submFileName = submFileAnchor.text
-            
-            # name, mail, submissionState, overdue, fileLink, fileName
-            subm = MoodleSubmission(name, mail, subState, oDue, submFileLink, submFileName)
-            data.append(subm)
+        data = parseSubmissions(html)
 
         print('Found a total of %i submissions' % len(data))
 #        input('' + str(studFilter is None))
@@ -420,46 +395,117 @@ class MoodleCourse:
         
         return self.__getSubmissions(url, session, studFilter)
     
+    def iterSubmissions(self, session, sesskey, sheetNr, studFilter = None):
+        """
+            Like getAllSubmissions, but yields the submissions while the
+            grading table is still downloading.
+        """
+        print('MoodleCourse#iterSubmissions', studFilter is None)
+        session.get(self.__url)
+        url = self.__prepareFilterOnSite(session, sesskey, sheetNr)
+        
+        subms = streamSubmissions(session.get(url, stream = True))
+        if studFilter is None:
+            return subms
+        return (subm for subm in subms if studFilter.matches(subm.name, subm.mail)[1])
+    
     
 #==============================================================================
 
 class Moodle:
 
-    __baseURL = 'https://elearning2.uni-heidelberg.de'
-    
-    def __init__(self, acc : MoodleAccount):
+    def __init__(self, acc : MoodleAccount, cache = None, sessions = None, transport = None
+                 , baseURL = None, metrics = None, keepSession = False):
         self.__acc = acc
+        self.__keepSession = keepSession
+        self.__metrics = metrics
+        self.__baseURL = baseURL or MOODLE_URL
+        self.__cache = cache
+        self.__sessions = sessions
+        self.__transport = transport
         self.__session = None
         self.__sesskey = None
+        self.__failed = []
     
     #--------------------------------------------------------------------------
     
+    @property
+    def __sessionName(self):
+        return 'MOODLE:' + self.__acc.username
+    
+    def __resume(self):
+        # a stored session is valid as long as the profile is not redirected to the login
+        if self.__sessions is None:
+            return False
+        extras = self.__sessions.load(self.__sessionName, self.__session)
+        if extras is None:
+            return False
+        
+        r = self.__session.get(self.__baseURL + '/user/profile.php', allow_redirects = False, stream = True)
+        r.close()
+        if r.status_code == requests.codes.ok:
+            print('Moodle - resumed session')
+            self.__sesskey = extras['sesskey']
+            return True
+        
+        self.__session.cookies.clear()
+        self.__sessions.drop(self.__sessionName)
+        return False
+    
     def login (self):
-        self.__session = Session()
-        website = Moodle.__baseURL + "/login/index.php"
+        # requests is only imported with the first login
+        if self.__transport is None:
+            from transport import Transport
+            self.__transport = Transport
+        
+        self.__session = self.__transport()
+        if self.__resume():
+            return
+        
+        website = self.__baseURL + "/login/index.php"
         print('login', website)
         r = self.__session.post(website, data = dict(username = self.__acc.username, password = self.__acc.password))
         
         if r.url == website or r.status_code != requests.codes.ok:
             raise RuntimeError('Login failed! - Check ur internet connection, username and password')
             
-        soup = BeautifulSoup(self.__session.get(r.url).text, 'html.parser')
-        start = soup.text.find('sesskey')
-        # "sesskey":"adsasnin", - pattern
-        self.__sesskey = soup.text[start - 1:].split(',')[0].split(':')[1][1:-1]
+        self.__sesskey = parseSesskey(r.text)
+        if self.__sessions is not None:
+            self.__sessions.save(self.__sessionName, self.__session, sesskey = self.__sesskey)
+        
+    def __dumpMetrics(self):
+        # metrics is the file for the request metrics of this session
+        if self.__metrics is None or not hasattr(self.__session, 'metrics'):
+            return
+        metrics = self.__session.metrics
+        metrics.dump(self.__metrics)
+        print('Moodle - %i requests, %.1f MiB, metrics in %s' \
+              % (metrics.requests, metrics.bytes / 2 ** 20, self.__metrics))
+        DataTable(SUMMARY_KEYS, metrics.summaryRows()).printToStream()
         
     def logout (self):
         print('Moodle - logout()')
        
-        website = Moodle.__baseURL + '/login/logout.php?sesskey=%s' % self.__sesskey
+        website = self.__baseURL + '/login/logout.php?sesskey=%s' % self.__sesskey
         r = self.__session.post(website)
         
+        self.__dumpMetrics()
         self.__session.close()
         self.__session = None
         self.__sesskey = None
+        if self.__sessions is not None:
+            self.__sessions.drop(self.__sessionName)
         
         if r.status_code != requests.codes.ok:
             raise RuntimeError('Logout Failed - Session was closed!')
+            
+    def suspend (self):
+        """ Stores the session for the next run instead of logging out """
+        self.__sessions.save(self.__sessionName, self.__session, sesskey = self.__sesskey)
+        self.__dumpMetrics()
+        self.__session.close()
+        self.__session = None
+        self.__sesskey = None
     
     #--------------------------------------------------------------------------
     
@@ -468,48 +514,82 @@ class Moodle:
         return self
     
     def __exit__ (self, type, value, traceback):
-        self.logout()
+        # the server side session ends unless it is explicitly kept for the next run
+        if self.__keepSession and self.__sessions is not None:
+            self.suspend()
+        else:
+            self.logout()
     
     #--------------------------------------------------------------------------
     
+    def __pages(self):
+        # the category pages change rarely, they may come from the page cache
+        if self.__cache is None:
+            return self.__session
+        return CachedSession(self.__session, self.__cache, scope = self.__acc.username)
+    
     def listSemesters(self):
-        legacy = 'https://elearning2.uni-heidelberg.de/course/index.php'
-        soup = BeautifulSoup(self.__session.post(legacy).text, 'html.parser')
-        
-        url = 'https://elearning2\.uni-heidelberg\.de/course/' \
-                + 'index.php\?categoryid=\d+'
-        rows = soup.findAll('a', href = rcompile(url))
-        
-        return [(row.text, row['href'])for row in rows]
+        legacy = self.__baseURL + '/course/index.php'
+        return parseSemesters(self.__pages().post(legacy, idempotent = True).text, self.__baseURL)
         
     
     def getAllFacilities(self, semesterURL = None):
-        soup = BeautifulSoup(self.__session.post(semesterURL or Moodle.__baseURL).text, 'html.parser')
-        url = 'https://elearning2\.uni-heidelberg\.de/course/' \
-                + 'index.php\?categoryid=\d+'
-        rows = soup.findAll('a', href = rcompile(url))
-        
-        get_id = lambda row : row['href'].split('?categoryid=')[1]
-        toFac = lambda row : MoodleFacility(get_id(row), row.text, row['href'])
-        
-        return [toFac(row) for row in rows]
+        r = self.__pages().post(semesterURL or self.__baseURL, idempotent = True)
+        return parseFacilities(r.text, self.__baseURL)
     
     def getAllSubFacilites(self, fac : MoodleFacility):
-        return fac.getSubFacs(self.__session)
+        return fac.getSubFacs(self.__pages())
     
     def getAllCourses(self, sFac : MoodleSubFacility):
-        return sFac.getCourses(session = self.__session)
+        return sFac.getCourses(session = self.__pages())
     
     def getAllSubmissions(self, course : MoodleCourse, sheetNr, filt):
         print("Moodle#getAllSubmissions", filt is None)
         return course.getAllSubmissions(self.__session, self.__sesskey, sheetNr, filt)
     
-    def downloadAllSubmissions(self, dest, course : MoodleCourse, sheetNr, filt, key = lambda sm : sm.name):
+    def iterSubmissions(self, course : MoodleCourse, sheetNr, filt):
+        return course.iterSubmissions(self.__session, self.__sesskey, sheetNr, filt)
+    
+    def downloadAllSubmissions(self, dest, course : MoodleCourse, sheetNr, filt, key = lambda sm : sm.name, workers = 1, writer = None, stream = False):
+        """
+            With stream = True the downloads start while the grading table
+            is still parsed, the results are sorted by key afterwards.
+        """
         print("Moodle#downloadAllSubmissions", filt is None)
-        subms = self.getAllSubmissions(course, sheetNr, filt)
-        input('Filtered: ' + str(len(subms)))
-        subms.sort(key = key)
-        return [(subm, subm.download(self.__session, dest)) for subm in subms]
+        if stream:
+            subms = self.iterSubmissions(course, sheetNr, filt)
+        else:
+            subms = self.getAllSubmissions(course, sheetNr, filt)
+            input('Filtered: ' + str(len(subms)))
+            subms.sort(key = key)
+        
+        writer = writer or StreamWriter()
+        start = perf_counter()
+        
+        if workers <= 1:
+            results = parallelMap(lambda subm : subm.download(self.__session, dest, writer), subms, workers)
+        else:
+            with SessionPool(self.__session) as sessions:
+                download = lambda subm : subm.download(sessions.get(), dest, writer)
+                results = parallelMap(download, subms, workers)
+        
+        results.sort(key = lambda result : key(result[0]))
+        seconds = perf_counter() - start
+        nbytes = sum(subm.transfer.bytes for subm, _, error in results if error is None)
+        print('Downloaded %.2f MB in %.2f s (%.2f MB/s)' % (nbytes / 1e6, seconds, nbytes / 1e6 / max(seconds, 1e-9)))
+        
+        self.__failed = [(subm, error) for subm, _, error in results if error is not None]
+        for subm, error in self.__failed:
+            print('Download failed @ %s - %s' % (subm.name, error))
+        if len(self.__failed) > 0:
+            print('%i of %i downloads failed' % (len(self.__failed), len(results)))
+        
+        return [(subm, path) for subm, path, error in results if error is None]
+    
+    @property
+    def failedDownloads(self):
+        """ List of (subm, error) of the last downloadAllSubmissions call. """
+        return list(self.__failed)
         
     def downloadSubmission(self, dest, subm : MoodleSubmission):
         return subm.download(self.__session, dest)
@@ -517,3 +597,332 @@ class Moodle:
 #==============================================================================
         
 
+# Parsing of the Moodle pages. The functions only work on the html text, so
+# the blocking and the asynchronous clients share them.
+
+def parseSesskey(html):
+    # M.cfg = {..."sesskey":"adsasnin",...} is in the head of every page
+    match = rcompile('"sesskey"\s*:\s*"([^"]+)"').search(html)
+    if match is not None:
+        return match.group(1)
+    
+    text = makeSoup(html).text
+    start = text.find('sesskey')
+    # "sesskey":"adsasnin", - pattern
+    return text[start - 1:].split(',')[0].split(':')[1][1:-1]
+
+def courseLinks(baseURL, page):
+    """ Pattern of the links to baseURL/course/<page> """
+    return rcompile(rescape(baseURL.rstrip('/')) + '/course/' + page)
+
+def siteOf(url):
+    """ https://host/moodle/course/index.php?categoryid=3 -> https://host/moodle """
+    return url.split('/course/')[0]
+
+def parseSemesters(html, baseURL = MOODLE_URL):
+    url = courseLinks(baseURL, 'index.php\?categoryid=\d+')
+    soup = makeSoup(html, SoupStrainer('a', href = url))
+    rows = soup.findAll('a', href = url)
+    
+    return [(row.text, row['href'])for row in rows]
+
+def parseFacilities(html, baseURL = MOODLE_URL):
+    url = courseLinks(baseURL, 'index.php\?categoryid=\d+')
+    soup = makeSoup(html, SoupStrainer('a', href = url))
+    rows = soup.findAll('a', href = url)
+    
+    get_id = lambda row : row['href'].split('?categoryid=')[1]
+    toFac = lambda row : MoodleFacility(get_id(row), row.text, row['href'])
+    
+    return [toFac(row) for row in rows]
+
+def parseSubFacilities(fac : MoodleFacility, html):
+    url = courseLinks(siteOf(fac.url), 'index\.php\?categoryid=\d+$')
+
+    soup = makeSoup(html, SoupStrainer('a', href = url))
+    rows = soup.findAll('a', href = url, attrs = {'itemprop' : False})
+
+    get_id = lambda row : row['href'].split('?categoryid=')[1]
+    toSubFac = lambda row : MoodleSubFacility(fac, get_id(row), row.text, row['href'])
+    
+    return [toSubFac(row) for row in rows]
+
+def parseCourses(subFac : MoodleSubFacility, html):
+    soup = makeSoup(html, SoupStrainer('div', attrs = {'class' : rcompile('course_category_tree')}))
+    elem = soup.find('div', attrs={'class':'course_category_tree'})
+    url = courseLinks(siteOf(subFac.url), 'view\.php\?id=\d+')
+    rows = elem.findAll('a', href = url)
+
+    return [MoodleCourse(subFac, row.text, row['href']) for row in rows]
+
+#------------------------------------------------------------------------------
+
+def parseSheetLink(html, sheetNr):
+    soup = makeSoup(html, SoupStrainer('a', onclick = True, href = True))
+    anchors = soup.findAll('a', onclick = True, href = True)
+
+    text = 'Übungsblatt %i Aufgabe' % sheetNr
+    fil = lambda x: [a for a in x if text == a.text][0]
+   
+    sheetLink = fil(anchors)['href']
+    
+    if sheetLink == None:
+        raise ValueError('The exercise sheet was not found')
+    return sheetLink
+
+def parseSubmissionsLink(html):
+    btnAs = makeSoup(html, SoupStrainer('a', href = True)).findAll('a', href=True, attrs={'class':'btn'}, text='Alle Abgaben anzeigen')
+    if len(btnAs) == 1:
+        return btnAs[0]['href']
+        
+    elif len(btnAs) < 1:
+        raise ValueError('No btn found!')
+        
+    else:
+        raise ValueError('Too much btns found!')
+
+def parseFilterForm(html, sesskey):
+    soup = makeSoup(html)
+    classAttrs = soup.find('body').attrs['class']
+    formData = {}
+    for attr in classAttrs:
+        if 'context-' in attr:
+            formData['contextid'] = attr.split('-')[1]
+        elif 'cmid-' in attr:
+            formData['id'] = attr.split('-')[1]
+            
+
+    # href contains a link where the userid is  a subsequence of
+    # split the href at '?'. right side contains userid (uid)
+    # pattern of uidElem = id=<num>
+    uidElem = soup.find('a', href = True, attrs = {'class':'icon menu-action', 'role':'menuitem', 'data-title':'profile,moodle'})
+    
+    formData['userid'] = uidElem['href'].split('?')[1].split('=')[1]
+    formData['action'] = 'saveoptions'
+    formData['sesskey'] = sesskey
+    formData['_qf__mod_assign_grading_options_form'] = '1'
+    formData['mform_isexpanded_id_general'] = '0'
+    formData['perpage'] = '-1'
+    formData['downloadasfolders'] = '1'
+    return formData
+
+def parseSubmissions(html):
+    data = []
+    soup = makeSoup(html, SoupStrainer('table', attrs = {'class' : rcompile('generaltable')}))
+    table = soup.findAll('table', attrs={'class':'flexible generaltable generalbox'})[0]
+    rows = table.findChildren('tr')
+
+    # Row structure
+    # Cell 0: CheckBox 
+    # Cell 1: Picture
+    # Cell 2: Name                   <<<
+    # Cell 3: E-Mail
+    # Cell 4: State                  <<<
+    # Cell 5: Grade
+    # Cell 6: Edit
+    # Cell 7: Last Modified
+    # Cell 8: Filelink               <<<
+    # Cell 9 - 13: Feedbackstuff
+    
+    for row in rows:
+        name = row.find('td', attrs={'class':'cell c2'})
+        if name != None:
+            name = name.find('a').text
+        else:
+            continue
+        
+        mail = row.find('td', attrs={'class':'cell c3 email'})
+        if mail != None:
+            mail = mail.text
+        
+        date = row.find('td', attrs={'class':'cell c4'})
+        if date == None:
+            continue
+        
+        oDue = date.find('div', attrs={'class':'overduesubmission'})
+        if oDue != None:
+            oDue = oDue.text
+        else:
+            lSub = date.find('div', attrs={'class':'latesubmission'})
+            oDue = '' if lSub is None else lSub.text
+            
+        subState = date.find('div').text
+        
+        submFile = row.find('td', attrs={'class':'cell c8'})
+        if submFile == None:
+            continue
+
+        submFileAnchor = submFile.find('a', href=True)
+        if submFileAnchor == None:
+            continue
+        submFileLink = submFileAnchor['href']
+        submFileName = submFileAnchor.text
+        
+        # name, mail, submissionState, overdue, fileLink, fileName
+        subm = MoodleSubmission(name, mail, subState, oDue, submFileLink, submFileName)
+        data.append(subm)
+        
+    return data
+
+#==============================================================================
+
+class GradingTableParser(HTMLParser):
+    
+    """
+        Event driven parser for the grading table. Feed it the page in
+        pieces and collect the finished rows with pop(). It extracts the same
+        cells as parseSubmissions, but never holds more than one row.
+    """
+    __void = set(['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input'
+                  , 'link', 'meta', 'param', 'source', 'track', 'wbr'])
+    __cells = {'cell c2' : 'c2', 'cell c3 email' : 'c3', 'cell c4' : 'c4', 'cell c8' : 'c8'}
+    
+    def __init__(self):
+        super().__init__()
+        self.__stack = []
+        self.__table = None
+        self.__row = None
+        self.__cell = None
+        self.__captures = []
+        self.__ready = []
+        self.done = False
+        
+    #--------------------------------------------------------------------------
+    
+    def pop(self):
+        ready, self.__ready = self.__ready, []
+        return ready
+    
+    @property
+    def found(self):
+        """ True once the grading table started """
+        return self.__table is not None
+    
+    def __capture(self, key):
+        if key not in self.__row:
+            self.__row[key] = None
+            self.__captures.append((key, len(self.__stack), []))
+    
+    def __emitRow(self, row):
+        cells = row['cells']
+        if 'c2' not in cells or row.get('name') is None:
+            return
+        if 'c4' not in cells or 'c8' not in cells or 'link' not in row:
+            return
+        
+        oDue = row.get('overdue')
+        if oDue is None:
+            oDue = row.get('late') or ''
+        
+        # name, mail, submissionState, overdue, fileLink, fileName
+        self.__ready.append(MoodleSubmission(row['name'], row.get('mail'), row.get('state') or ''  \
+                                             , oDue, row['link'], row.get('file') or ''))
+    
+    #--------------------------------------------------------------------------
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in GradingTableParser.__void or self.done:
+            return
+        
+        self.__stack.append(tag)
+        attrs = dict(attrs)
+        cls = ' '.join((attrs.get('class') or '').split())
+        
+        if self.__table is None:
+            if tag == 'table' and cls == 'flexible generaltable generalbox':
+                self.__table = len(self.__stack)
+            return
+        
+        if tag == 'tr':
+            self.__row = {'cells' : set(), 'depth' : len(self.__stack)}
+            return
+        
+        if self.__row is None:
+            return
+        
+        kind = GradingTableParser.__cells.get(cls)
+        if tag == 'td' and self.__cell is None and kind is not None and kind not in self.__row['cells']:
+            self.__row['cells'].add(kind)
+            self.__cell = (kind, len(self.__stack))
+            if kind == 'c3':
+                self.__capture('mail')
+            return
+        
+        if self.__cell is None:
+            return
+        
+        kind = self.__cell[0]
+        if kind == 'c2' and tag == 'a':
+            self.__capture('name')
+            
+        elif kind == 'c4' and tag == 'div':
+            self.__capture('state')
+            classes = cls.split()
+            if 'overduesubmission' in classes:
+                self.__capture('overdue')
+            if 'latesubmission' in classes:
+                self.__capture('late')
+                
+        elif kind == 'c8' and tag == 'a' and 'href' in attrs and 'link' not in self.__row:
+            self.__row['link'] = attrs['href'] or ''
+            self.__capture('file')
+    
+    def handle_endtag(self, tag):
+        if tag in GradingTableParser.__void or self.done or tag not in self.__stack:
+            return
+        
+        while self.__stack.pop() != tag:
+            pass
+        depth = len(self.__stack)
+        
+        while len(self.__captures) > 0 and self.__captures[-1][1] > depth:
+            key, _, parts = self.__captures.pop()
+            self.__row[key] = ''.join(parts)
+        
+        if self.__cell is not None and self.__cell[1] > depth:
+            self.__cell = None
+        
+        if self.__row is not None and self.__row['depth'] > depth:
+            self.__emitRow(self.__row)
+            self.__row = None
+            
+        if self.__table is not None and self.__table > depth:
+            self.__table = None
+            self.done = True
+    
+    def handle_data(self, data):
+        for _, _, parts in self.__captures:
+            parts.append(data)
+
+#------------------------------------------------------------------------------
+
+def streamSubmissions(response, chunkSize = 64 * 1024):
+    """
+        Yields the MoodleSubmissions of a streamed grading page response as
+        soon as their rows are complete. Raises ValueError if the page has
+        no grading table.
+    """
+    decoder = getincrementaldecoder(response.encoding or 'utf-8')(errors = 'replace')
+    parser = GradingTableParser()
+    
+    try:
+        for chunk in response.iter_content(chunk_size = chunkSize):
+            parser.feed(decoder.decode(chunk))
+            yield from parser.pop()
+            
+            # the rest of the page does not matter
+            if parser.done:
+                return
+            
+        parser.feed(decoder.decode(b'', final = True))
+        parser.close()
+        yield from parser.pop()
+        
+        # a login or error page, an empty stage would hide the submissions
+        if not parser.found:
+            raise ValueError('No grading table found in %s' % getattr(response, 'url', 'the page'))
+        
+    finally:
+        response.close()
+
+#==============================================================================
@@ -6,15 +6,18 @@ Created on Sun Oct 22 16:01:37 2017
 """
 
 import json
-from bs4 import BeautifulSoup
 import re
-import requests
 import sys
 
 from copy import deepcopy
 
 from student import Student
-from util import Cipher
+from util import Cipher, DataTable, SessionPool, parallelMap, lazyImport
+from httpcache import CachedSession
+from metrics import SUMMARY_KEYS
+from htmlparse import makeSoup, SoupStrainer
+
+requests = lazyImport('requests')
 
 #==============================================================================
 
@@ -126,33 +129,92 @@ class Tutorial:
 
 class Muesli:
     
-    def __init__ (self, acc : MuesliAcc):
+    def __init__ (self, acc : MuesliAcc, cache = None, sessions = None, transport = None
+                  , baseURL = 'https://muesli.mathi.uni-heidelberg.de', metrics = None
+                  , keepSession = False):
         self.__acc = acc
-        self.baseURL = 'https://muesli.mathi.uni-heidelberg.de'
+        self.__keepSession = keepSession
+        self.__metrics = metrics
+        self.__cache = cache
+        self.__sessions = sessions
+        self.__transport = transport
+        self.baseURL = baseURL
         self.session = None
         self.curURL = None
     
     #--------------------------------------------------------------------------
     
+    @property
+    def __sessionName(self):
+        return 'MÜSLI:' + self.__acc.mail
+    
+    def __resume(self):
+        # the start page is only served without a redirect while logged in
+        if self.__sessions is None:
+            return False
+        if self.__sessions.load(self.__sessionName, self.session) is None:
+            return False
+        
+        r = self.session.get(self.baseURL + '/start', allow_redirects = False, stream = True)
+        r.close()
+        if r.status_code == requests.codes.ok:
+            print('MÜSLI - resumed session')
+            self.curURL = self.baseURL + '/start'
+            return True
+        
+        self.session.cookies.clear()
+        self.__sessions.drop(self.__sessionName)
+        return False
+    
     def login (self):
         print('MÜSLI - login()')
-        self.session = requests.Session()
+        # requests is only imported with the first login
+        if self.__transport is None:
+            from transport import Transport
+            self.__transport = Transport
+        
+        self.session = self.__transport()
+        if self.__resume():
+            return
+        
         website = self.baseURL + "/user/login"
         r = self.session.post(website, data = dict(email = self.__acc.mail, password = self.__acc.passw))
         if r.url == website or r.status_code != requests.codes.ok:
             raise RuntimeError('Login failed! - Check ur internet connection, username and password')
         self.curURL = str(r.url)
+        if self.__sessions is not None:
+            self.__sessions.save(self.__sessionName, self.session)
+
+    def __dumpMetrics(self):
+        # metrics is the file for the request metrics of this session
+        if self.__metrics is None or not hasattr(self.session, 'metrics'):
+            return
+        metrics = self.session.metrics
+        metrics.dump(self.__metrics)
+        print('MÜSLI - %i requests, %.1f MiB, metrics in %s' \
+              % (metrics.requests, metrics.bytes / 2 ** 20, self.__metrics))
+        DataTable(SUMMARY_KEYS, metrics.summaryRows()).printToStream()
 
     def logout (self):
         print('MÜSLI - logout')
         website = self.baseURL + '/user/logout'
-        resultWeb = "https://muesli.mathi.uni-heidelberg.de/"
+        resultWeb = self.baseURL + "/"
         r = self.session.post(website)
+        self.__dumpMetrics()
         self.session.close()
         self.session = None
+        if self.__sessions is not None:
+            self.__sessions.drop(self.__sessionName)
 
         if r.url != resultWeb or r.status_code != requests.codes.ok:
             raise RuntimeError('Logout Failed - Session was closed!')
+            
+    def suspend (self):
+        """ Stores the session for the next run instead of logging out """
+        self.__sessions.save(self.__sessionName, self.session)
+        self.__dumpMetrics()
+        self.session.close()
+        self.session = None
     
     #--------------------------------------------------------------------------
     
@@ -161,101 +223,73 @@ class Muesli:
         return self
         
     def __exit__ (self, type, value, traceback):
-        self.logout()
+        # the server side session ends unless it is explicitly kept for the next run
+        if self.__keepSession and self.__sessions is not None:
+            self.suspend()
+        else:
+            self.logout()
         
     #--------------------------------------------------------------------------
     
-    def __extractTutorialInfo (self, tutoralLink):
-        r = self.session.post(tutoralLink)
-        soup = BeautifulSoup(r.text, 'html.parser')
-        headers = soup.findAll("h2")
-        pattern = re.compile("Übungsgruppe .*")
-
-        result = {}
-        days = {"Mo" : "Montag",
-                "Di" : "Dienstag",
-                "Mi" : "Mittwoch",
-                "Do" : "Donnerstag",
-                "Fr" : "Freitag",
-                "Sa" : "Samstag",
-                "So" : "Sonntag"}
-
+    def __pages(self, session = None):
+        # tutorial pages change rarely, they may come from the page cache
+        session = session or self.session
+        if self.__cache is None:
+            return session
+        return CachedSession(session, self.__cache, scope = self.__acc.mail)
+    
+    def __fetchAll(self, fn, items, workers, what, name = str):
         """
-            The header looks like:
-                
-            Übungsgruppe zur 
-              Vorlesung Einführung in die praktische Informatik
-             am Mo 16:00 (SR B128, Mathematikon B, Berliner Straße 43)
+            Calls fn(session, item) for all items, with workers > 1 on a pool
+            of copies of the logged in session. Keeps the order of items and
+            raises one RuntimeError naming every item that failed.
         """
-
-        result["Tutor"] = soup.find("p").text.split(':')[1].strip()
-
-        for header in headers:
-            if pattern.match(header.text):
-                words = header.text.split(' ')
-                for i in range(0, len(words)):
-                    if "Vorlesung" == words[i]:
-                        result["Subject"] = ' '.join(words[i + 1:]).split('\n')[0]
-
-                    elif "am" == words[i]:
-                        result["Day"] = days[words[i + 1]]
-                        result["Time"] = words[i + 2]
-
-                    elif re.compile("\(.*SR.*").match(words[i]):
-                        result["Place"] = ' '.join(words[i:]).strip()[1:-1]
-
-        return Tutorial(result["Subject"], result["Day"], result["Time"] \
-                            , result.get("Place", "Unkown Location")       \
-                            , url=tutoralLink                              \
-                            , tutor=result["Tutor"])
+        if workers <= 1:
+            results = parallelMap(lambda item : fn(self.session, item), items, workers)
+        else:
+            with SessionPool(self.session) as sessions:
+                results = parallelMap(lambda item : fn(sessions.get(), item), items, workers)
+        
+        failed = [(item, error) for item, _, error in results if error is not None]
+        for item, error in failed:
+            print('MÜSLI - %s failed @ %s - %s' % (what, name(item), error))
+        if len(failed) > 0:
+            raise RuntimeError('%i of %i %s failed: %s' % (len(failed), len(results), what
+                                                           , ', '.join(name(item) for item, _ in failed)))
+        
+        return [result for _, result, _ in results]
     
-    def getAllTutorials(self, show_all = False):
-        startURL = 'https://muesli.mathi.uni-heidelberg.de/start'
+    def __extractTutorialInfo (self, session, tutoralLink):
+        r = self.__pages(session).post(tutoralLink, idempotent = True)
+        return parseTutorialInfo(tutoralLink, r.text)
+    
+    def getAllTutorials(self, show_all = False, workers = 1):
+        startURL = self.baseURL + '/start'
         if show_all:
-            r = self.session.post(startURL + '?show_all=1')
+            r = self.__pages().post(startURL + '?show_all=1', idempotent = True)
         else:
-            r = self.session.post(startURL)
+            r = self.__pages().post(startURL, idempotent = True)
         
-        soup = BeautifulSoup(r.text, 'html.parser')
-        anchors = soup.findAll("a", href=re.compile("/tutorial/view/\d*"), title=False)
-        result = [self.baseURL + anchors[i].get("href") for i in range(0, len(anchors))]
+        result = parseTutorialLinks(self.baseURL, r.text)
 
-        return list(map(self.__extractTutorialInfo, result))
+        return self.__fetchAll(self.__extractTutorialInfo, result, workers, 'tutorial pages')
     
     #--------------------------------------------------------------------------
     
-    def __getAllStudents(self, tut : Tutorial):
-        r = self.session.post(tut.url)
-        soup = BeautifulSoup(r.text, 'html.parser')
-        tables = soup.findAll("table", attrs={"class":"colored"})
-        students = []
-
-        if len(tables) != 1:
-            raise RuntimeError("On", tut.url
-                               , "there where", len(tables)
-                               , "colored tables (1 expected)!")
-
-        def extractMail(col):
-            return col.find('a')['href'][len('mailto:'):]
-        
-        def toStudent(cols):
-            return Student(cols[0].text, extractMail(cols[0]), cols[1].text \
-                           , tut.day, tut.time, tut.tutor)
-        
-        grid = map(lambda row : row.findAll('td'), tables[0].findAll('tr'))
-        students = [toStudent(cols) for cols in grid if len(cols) > 0]
-
-        return sorted(students, key=lambda x: x.name)
+    def __getAllStudents(self, session, tut : Tutorial):
+        r = session.post(tut.url, idempotent = True)
+        return parseStudents(tut, r.text)
     
-    def getAllStudents(self, tut):
+    def getAllStudents(self, tut, workers = 1):
         if isinstance(tut, list):
             res = []
-            for t in tut:
-                res.extend(self.getAllStudents(t))
+            for students in self.__fetchAll(self.__getAllStudents, tut, workers, 'student tables'
+                                          , name = lambda t : t.url):
+                res.extend(students)
             return res
         
         elif isinstance(tut, Tutorial):
-            return self.__getAllStudents(tut)
+            return self.__getAllStudents(self.session, tut)
         
         else:
             raise RuntimeError("Need a 'list of Tutorials' or a 'Tutorial'")
@@ -264,3 +298,77 @@ class Muesli:
         
 #==============================================================================
 
+# Parsing of the MÜSLI pages. The functions only work on the html text, so
+# the blocking and the asynchronous clients share them.
+
+def parseTutorialLinks(baseURL, html):
+    soup = makeSoup(html, SoupStrainer("a", href=re.compile("/tutorial/view/\d*")))
+    anchors = soup.findAll("a", href=re.compile("/tutorial/view/\d*"), title=False)
+    return [baseURL + anchors[i].get("href") for i in range(0, len(anchors))]
+
+def parseTutorialInfo(tutoralLink, html):
+    soup = makeSoup(html, SoupStrainer(["h2", "p"]))
+    headers = soup.findAll("h2")
+    pattern = re.compile("Übungsgruppe .*")
+
+    result = {}
+    days = {"Mo" : "Montag",
+            "Di" : "Dienstag",
+            "Mi" : "Mittwoch",
+            "Do" : "Donnerstag",
+            "Fr" : "Freitag",
+            "Sa" : "Samstag",
+            "So" : "Sonntag"}
+
+    """
+        The header looks like:
+            
+        Übungsgruppe zur 
+          Vorlesung Einführung in die praktische Informatik
+         am Mo 16:00 (SR B128, Mathematikon B, Berliner Straße 43)
+    """
+
+    result["Tutor"] = soup.find("p").text.split(':')[1].strip()
+
+    for header in headers:
+        if pattern.match(header.text):
+            words = header.text.split(' ')
+            for i in range(0, len(words)):
+                if "Vorlesung" == words[i]:
+                    result["Subject"] = ' '.join(words[i + 1:]).split('\n')[0]
+
+                elif "am" == words[i]:
+                    result["Day"] = days[words[i + 1]]
+                    result["Time"] = words[i + 2]
+
+                elif re.compile("\(.*SR.*").match(words[i]):
+                    result["Place"] = ' '.join(words[i:]).strip()[1:-1]
+
+    return Tutorial(result["Subject"], result["Day"], result["Time"] \
+                        , result.get("Place", "Unkown Location")       \
+                        , url=tutoralLink                              \
+                        , tutor=result["Tutor"])
+
+def parseStudents(tut : Tutorial, html):
+    soup = makeSoup(html, SoupStrainer("table", attrs={"class":re.compile("colored")}))
+    tables = soup.findAll("table", attrs={"class":"colored"})
+    students = []
+
+    if len(tables) != 1:
+        raise RuntimeError("On", tut.url
+                           , "there where", len(tables)
+                           , "colored tables (1 expected)!")
+
+    def extractMail(col):
+        return col.find('a')['href'][len('mailto:'):]
+    
+    def toStudent(cols):
+        return Student(cols[0].text, extractMail(cols[0]), cols[1].text \
+                       , tut.day, tut.time, tut.tutor)
+    
+    grid = map(lambda row : row.findAll('td'), tables[0].findAll('tr'))
+    students = [toStudent(cols) for cols in grid if len(cols) > 0]
+
+    return sorted(students, key=lambda x: x.name)
+
+#==============================================================================
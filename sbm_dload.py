@@ -3,42 +3,181 @@
 """
 Created on Thu Nov  2 09:19:29 2017
 
+Downloads, corrects and unpacks the submissions of one or more sheets:
+
+    python sbm_dload.py                 - asks for the sheet number
+    python sbm_dload.py 1-12 14         - sheets 1 to 12 and 14
+
+All sheets share one Moodle login. While a sheet downloads, the sheet
+before it is corrected and unpacked. The summary of every sheet is
+printed and written into sheets.table.
+
 @author: ctoffer
 """
 
-from mdc import MetaData
+import sys
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from os import cpu_count
+from os import getcwd as o_getcwd
+from os.path import join as p_join
+from time import perf_counter
+
+from mdc import MetaData, KEEP_SESSION
 from moodle import Moodle
-from student import StudentFilter
+from util import DataTable
 
 from folder import SubmissionFolder
 
+import tracing
+
+DOWNLOAD_WORKERS = 8
+UNPACK_WORKERS = cpu_count() or 1
+
+SUMMARY_NAME = 'sheets.table'
+SUMMARY_KEYS = ['Sheet', 'Downloaded', 'Failed', 'Corrected', 'Unpacked', 'Broken'
+                , 'Download s', 'Correct s', 'Unpack s', 'State']
+
+#==============================================================================
+
+def parseSheets(specs):
+    """ ['1-3', '5', '7,8'] -> [1, 2, 3, 5, 7, 8] """
+    sheets = []
+    for spec in specs:
+        for part in spec.split(','):
+            if part.strip() == '':
+                continue
+            first, _, last = part.partition('-')
+            first = int(first)
+            last = int(last) if last else first
+            if last < first:
+                raise ValueError('Empty sheet range %s' % part)
+            sheets += [nr for nr in range(first, last + 1) if nr not in sheets]
+    return sheets
+
+#------------------------------------------------------------------------------
+
+def timed(row, key, fn):
+    start = perf_counter()
+    try:
+        return fn()
+    finally:
+        row[key] = '%.2f' % (perf_counter() - start)
+
+def failed(row, stage, e):
+    row['State'] = 'ERROR in %s - %s: %s' % (stage, type(e).__name__, e)
+    print('[ERROR] Sheet %s - %s' % (row['Sheet'], row['State']))
+
+def downloadSheet(s, sheetNr, moodle, row):
+    print("Sheet %i - download from Moodle" % sheetNr)
+    with tracing.stage('download', sheet = sheetNr):
+        download = lambda : s.downloadSubsIntoOrigin(moodle, workers = DOWNLOAD_WORKERS, stream = True)
+        osubms = timed(row, 'Download s', download)
+    row['Downloaded'] = str(len(osubms))
+    row['Failed'] = str(len(moodle.failedDownloads))
+    return osubms
+
+def finishSheet(s, sheetNr, osubms, row):
+    """ Corrects and unpacks the sheet, errors end up in the row """
+    try:
+        lsubms = s.getLocalSubmissions()
+        if lsubms is None:
+            print("Sheet %i - correct from origin" % sheetNr)
+            with tracing.stage('correct', sheet = sheetNr):
+                lsubms = timed(row, 'Correct s', lambda : s.correctOrigin(osubms))
+        else:
+            print("Sheet %i - corrected archives present" % sheetNr)
+        row['Corrected'] = str(len(lsubms))
+
+        with tracing.stage('unpack', sheet = sheetNr):
+            unpack = lambda : s.unpackIntoWorking(lsubms, workers = UNPACK_WORKERS)
+            results = timed(row, 'Unpack s', unpack)
+        row['Unpacked'] = str(sum(1 for r in results if r['Error'] is None))
+        row['Broken'] = str(sum(1 for r in results if r['Error'] is not None))
+    except Exception as e:
+        failed(row, 'correct/unpack', e)
+
+#------------------------------------------------------------------------------
+
+def processSheets(sheets, connect, root = None):
+    """
+        Runs download, correction and unpacking for every sheet. connect
+        returns the Moodle context, it is only entered if a sheet has no
+        local originals. A sheet with failed downloads is neither corrected
+        nor unpacked, the next run downloads it again. Returns the summary
+        rows in the order of sheets.
+    """
+    root = root or o_getcwd()
+    folders = {nr : SubmissionFolder(root, nr) for nr in sheets}
+    rows = {nr : {key : '' for key in SUMMARY_KEYS} for nr in sheets}
+    originals = {nr : folders[nr].getOriginalSubmissions() for nr in sheets}
+    missing = [nr for nr in sheets if originals[nr] is None]
+
+    for nr in sheets:
+        rows[nr]['Sheet'] = str(nr)
+        rows[nr]['State'] = 'OK'
+
+    # one thread corrects and unpacks the sheets in order, so the next sheet
+    # downloads meanwhile; the unpacking itself runs in a process pool
+    with ThreadPoolExecutor(max_workers = 1) as local:
+        futures = []
+
+        with connect() if missing else nullcontext() as moodle:
+            for nr in sheets:
+                if originals[nr] is None:
+                    try:
+                        originals[nr] = downloadSheet(folders[nr], nr, moodle, rows[nr])
+                    except Exception as e:
+                        failed(rows[nr], 'download', e)
+                        continue
+                    
+                    # the origin stage is missing, correcting now would hide
+                    # the retried submissions behind a present local stage
+                    if rows[nr]['Failed'] != '0':
+                        rows[nr]['State'] = 'INCOMPLETE - %s downloads failed, run again' % rows[nr]['Failed']
+                        print('[WARN] Sheet %i - %s' % (nr, rows[nr]['State']))
+                        continue
+                else:
+                    print("Sheet %i - local originals present" % nr)
+                    rows[nr]['Downloaded'] = 'local'
+
+                futures.append(local.submit(finishSheet, folders[nr], nr, originals[nr], rows[nr]))
+
+        for future in futures:
+            future.result()
+
+    return [rows[nr] for nr in sheets]
+
+def writeSummary(root, rows):
+    table = DataTable(SUMMARY_KEYS, rows)
+    table.printToStream()
+    with open(p_join(root, SUMMARY_NAME), 'w', encoding = 'utf-8') as fp:
+        table.printToStream(stream = fp)
+
+#==============================================================================
+
 if __name__ == '__main__':
+    try:
+        sheets = parseSheets(sys.argv[1:])
+    except ValueError as e:
+        print(e)
+        print('Usage: python sbm_dload.py [sheetNr | first-last ...]')
+        sys.exit(1)
+
+    tracing.configureFromEnv()
     md = MetaData()
-    
-    sheetNr = int(input("Sheet number: "))
-
-    s = SubmissionFolder(sheetNr = sheetNr)
-    osubms = s.getOriginalSubmissions()
-    lsubms = s.getLocalSubmissions()
-    
-    if osubms is None:
-        with Moodle(acc = md.getMoodleAcc()) as moodle:
-            print("Download from Moodle")
-            osubms = s.downloadSubsIntoOrigin(moodle)
-    else:
-        print("Local originals present")
-        
-    #--------------------------------------------------------------------------
-        
-    if lsubms is None:
-        print("Correct from Origin")
-        lsubms = s.correctOrigin(osubms)
-    else:
-        print("Corrected archives present")
-    
-    #--------------------------------------------------------------------------
-    
-    s.unpackIntoWorking(lsubms)
-            
-        
-        
+
+    if len(sheets) == 0:
+        sheets = [int(input("Sheet number: "))]
+
+    connect = lambda : Moodle(acc = md.getMoodleAcc(), cache = md.getPageCache(), sessions = md.getSessionStore()
+                              , metrics = md.getMetricsPath('moodle-download'), keepSession = KEEP_SESSION)
+    # the trace of a failed run is the interesting one
+    try:
+        rows = processSheets(sheets, connect)
+        writeSummary(o_getcwd(), rows)
+    finally:
+        tracing.save()
+
+#==============================================================================
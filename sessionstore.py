@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:36:02 2026
+
+Keeps the cookies (and the Moodle sesskey) of a login between two runs, so
+a script only logs in again once the server dropped the session. The
+values are stored in MetaData/sessions.json, encoded with the Cipher just
+like accounts.json.
+
+Moodle and Muesli only keep their session with keepSession = True (mdc.py
+and sbm_dload.py: TUTORIAL_KEEP_SESSION=1), otherwise they log out and
+drop the stored session.
+
+@author: ctoffer
+"""
+
+import json
+
+from threading import Lock
+from time import time
+
+from os.path import exists as p_exists
+
+from util import Cipher
+
+#==============================================================================
+
+class SessionStore:
+
+    __key = 'my_session_key'
+
+    def __init__(self, path):
+        self.__path = path
+        self.__lock = Lock()
+
+    @property
+    def path(self):
+        return self.__path
+
+    #--------------------------------------------------------------------------
+
+    def __read(self):
+        if not p_exists(self.__path):
+            return dict()
+        with open(self.__path, 'r', encoding = 'utf-8') as fp:
+            return json.load(fp)
+
+    def __write(self, entries):
+        with open(self.__path, 'w', encoding = 'utf-8') as fp:
+            json.dump(entries, fp, indent = 4)
+
+    #--------------------------------------------------------------------------
+
+    @staticmethod
+    def __cookies(session):
+        return [{'name' : c.name, 'value' : c.value, 'domain' : c.domain, 'path' : c.path
+                 , 'secure' : c.secure, 'expires' : c.expires} for c in session.cookies]
+
+    def save(self, name, session, **extras):
+        """ Stores the cookies of session and the given str extras under name """
+        state = {'Cookies' : SessionStore.__cookies(session), 'Extras' : extras}
+
+        with Cipher(SessionStore.__key) as c:
+            entry = {'ID' : Cipher.invert(SessionStore.__key)
+                     , 'Saved' : time()
+                     , 'State' : c.encode(json.dumps(state))}
+
+        with self.__lock:
+            entries = self.__read()
+            entries[name] = entry
+            self.__write(entries)
+
+    def load(self, name, session):
+        """
+            Puts the stored cookies of name into session.
+            Returns the stored extras or None if nothing was stored.
+        """
+        with self.__lock:
+            entry = self.__read().get(name)
+        if entry is None:
+            return None
+
+        try:
+            with Cipher(Cipher.invert(entry['ID'])) as c:
+                state = json.loads(c.decode(entry['State']))
+        except (KeyError, ValueError):
+            return None
+
+        for cookie in state['Cookies']:
+            session.cookies.set(cookie['name'], cookie['value'], domain = cookie['domain']
+                                , path = cookie['path'], secure = cookie['secure']
+                                , expires = cookie['expires'])
+        return state['Extras']
+
+    def drop(self, name):
+        with self.__lock:
+            entries = self.__read()
+            if entries.pop(name, None) is not None:
+                self.__write(entries)
+
+#==============================================================================
@@ -6,6 +6,8 @@ Created on Sun Oct 29 14:32:18 2017
 @author: ctoffer
 """
 
+from functools import lru_cache
+
 #==============================================================================
 
 class Student:
@@ -79,37 +81,99 @@ class Student:
     @staticmethod
     def fromDict(dic : dict):
         return Student(dic['Name'], dic['Mail'], dic['Subject'], dic['Day']  \
-                       , dic['Time'], dic['State'], dic['Tutor'])
+                       , dic['Time'], dic['Tutor'], dic['State'])
         
 #==============================================================================
 
-class NameComparator:
+class RosterDiff:
     
-    def __init__(self):
-        self.__escape = lambda x: x.replace('Ö', 'Oe').replace('Ä', 'Ae') \
-                        .replace('Ü', 'Ue').replace('ö', 'oe') \
-                        .replace('ä', 'ae').replace('ü', 'ue') \
-                        .replace('ß', 'ss').capitalize()
+    """
+        Difference between a stored roster and freshly fetched student
+        tables, keyed by mail. Only students of the refreshed tutorials
+        (tids) can be removed, the rest of the roster is left alone.
+            added   - new mails
+            removed - mails no longer in their refreshed tutorial
+            moved   - (old, new) with a different tutorial
+            changed - (old, new) with the same tutorial but other data
+    """
+    def __init__(self, old, new, tids):
+        tids = set(tids)
+        oldByMail = {stud.mail : stud for stud in old}
+        newByMail = {stud.mail : stud for stud in new}
+        
+        self.__added = [stud for stud in new if stud.mail not in oldByMail]
+        self.__removed = [stud for stud in old if stud.tid in tids and stud.mail not in newByMail]
+        self.__moved = list()
+        self.__changed = list()
         
+        for mail, stud in newByMail.items():
+            prev = oldByMail.get(mail)
+            if prev is None:
+                continue
+            if prev.tid != stud.tid:
+                self.__moved.append((prev, stud))
+            elif prev.toDict() != stud.toDict():
+                self.__changed.append((prev, stud))
+                
+    @property
+    def added(self):
+        return list(self.__added)
     
-    def __call__(self, name1 : str, name2 : str):
-        return self.__compareNames(name1, name2)
+    @property
+    def removed(self):
+        return list(self.__removed)
+    
+    @property
+    def moved(self):
+        return list(self.__moved)
+    
+    @property
+    def changed(self):
+        return list(self.__changed)
     
-    def __escapeName(self, name : str):
-        return self.__escape(name)
+    @property
+    def updated(self):
+        """ The new version of every moved or changed student """
+        return [new for _, new in self.__moved + self.__changed]
+    
+    def isEmpty(self):
+        return len(self.__added) + len(self.__removed) + len(self.__moved) + len(self.__changed) == 0
+    
+    def apply(self, students):
+        """ The roster with the changes applied, new students at the end """
+        removed = set(stud.mail for stud in self.__removed)
+        updated = {stud.mail : stud for stud in self.updated}
+        
+        result = [updated.get(stud.mail, stud) for stud in students if stud.mail not in removed]
+        return result + self.__added
+    
+    def report(self):
+        lines = ['+ %s (%s) -> %s' % (stud.name, stud.mail, stud.tid) for stud in self.__added]
+        lines += ['- %s (%s) from %s' % (stud.name, stud.mail, stud.tid) for stud in self.__removed]
+        lines += ['~ %s (%s) %s -> %s' % (new.name, new.mail, old.tid, new.tid) for old, new in self.__moved]
+        lines += ['* %s (%s)' % (new.name, new.mail) for _, new in self.__changed]
+        return lines
+        
+#==============================================================================
 
+class NameComparator:
+    
+    """
+        Two names match if every part of the shorter name is contained in a
+        part of the other one or contains it (umlauts escaped, capitalized).
+        The escaped parts of a name are computed once and cached.
+    """
+    
+    def __call__(self, name1 : str, name2 : str):
+        return self.__compareNames(name1, name2)
     
     def __compareNames(self, name1 : str, name2 : str):
-        mod = lambda x : x.strip().split(' ')
-        return self.__compareNameParts(mod(name1), mod(name2))
+        return NameComparator.matchParts(escapeName(name1), escapeName(name2))
     
-    def __compareNameParts(self, nameParts1, nameParts2):
-        return self.__cmpNameParts([self.__escapeName(x) for x in nameParts1], 
-                        [self.__escapeName(x) for x in nameParts2])
-        
-    def __cmpNameParts(self, left, right):
+    @staticmethod
+    def matchParts(left, right):
         if len(left) > len(right):
-            return self.__cmpNameParts(right, left)
+            left, right = right, left
     
         count = 0
     
@@ -122,32 +186,113 @@ class NameComparator:
             
         return len(left) == count # minimum match first and last name
 
+#------------------------------------------------------------------------------
 
-#==============================================================================
+__umlauts = str.maketrans({'Ö' : 'Oe', 'Ä' : 'Ae', 'Ü' : 'Ue', 'ö' : 'oe'
+                           , 'ä' : 'ae', 'ü' : 'ue', 'ß' : 'ss'})
+
+@lru_cache(maxsize = 1 << 16)
+def escapeName(name : str):
+    """ 'Jürgen  Weiß' -> ('Juergen', '', 'Weiss') """
+    return tuple(x.translate(__umlauts).capitalize() for x in name.strip().split(' '))
 
-#i = 0
+def substrings(part : str, maxLen = None):
+    maxLen = len(part) if maxLen is None else maxLen
+    return set(part[i:j] for i in range(len(part)) \
+               for j in range(i + 1, min(len(part), i + maxLen) + 1))
+
+#==============================================================================
 
 class StudentFilter:
     
+    """
+        Matches names and mails against a roster. The roster is indexed once:
+            - mail -> position
+            - escaped name part -> positions
+            - every substring of up to three chars of a part -> positions
+        A name can only match a student who shares a part with it, where one
+        part contains the other. The index yields exactly these candidates,
+        which are then checked by the NameComparator rules.
+    """
+    __gram = 3
+    
     def __init__(self, refList : list):
         self.__refList = refList
-        self.__nCmp = NameComparator()
+        self.__parts = [escapeName(student.name) for student in refList]
+        self.__byMail = dict()
+        self.__byPart = dict()
+        self.__byGram = dict()
         
-    def matches(self, name, mail = None):
-        #global i
-        #print('StudentFilter#matches', i)
-        #i += 1
-        for student in self.__refList:
-            if mail is not None and mail == student.mail:
-                return (student, True)
+        for i, student in enumerate(refList):
+            self.__byMail.setdefault(student.mail, i)
             
-            elif self.__nCmp(student.name, name):
-                return (student, True)
+            for part in self.__parts[i]:
+                if part == '':
+                    continue
+                self.__byPart.setdefault(part, set()).add(i)
+                for gram in substrings(part, StudentFilter.__gram):
+                    self.__byGram.setdefault(gram, set()).add(i)
+    
+    #--------------------------------------------------------------------------
+    
+    def __containing(self, part):
+        # positions of students with a name part that contains part
+        if len(part) <= StudentFilter.__gram:
+            return self.__byGram.get(part, set())
+        
+        grams = [part[i:i + StudentFilter.__gram] for i in range(len(part) - StudentFilter.__gram + 1)]
+        postings = sorted((self.__byGram.get(gram, set()) for gram in grams), key = len)
+        return set.intersection(*postings)
+    
+    def __contained(self, part):
+        # positions of students with a name part that is contained in part
+        found = set()
+        for sub in substrings(part):
+            found |= self.__byPart.get(sub, set())
+        return found
+    
+    def __candidates(self, parts):
+        found = set()
+        for part in parts:
+            if part != '':
+                found |= self.__containing(part) | self.__contained(part)
+        return sorted(found)
+    
+    #--------------------------------------------------------------------------
+        
+    def matches(self, name, mail = None):
+        best = None if mail is None else self.__byMail.get(mail)
+        parts = escapeName(name)
+        
+        # the first student in the roster matching by mail or name wins
+        for i in self.__candidates(parts):
+            if best is not None and i >= best:
+                break
+            if NameComparator.matchParts(self.__parts[i], parts):
+                best = i
+                break
             
-        return (None, False)
+        if best is None:
+            return (None, False)
+        return (self.__refList[best], True)
+    
+    def findAll(self, name):
+        parts = escapeName(name)
+        return [self.__refList[i] for i in self.__candidates(parts) \
+                if NameComparator.matchParts(self.__parts[i], parts)]
     
     def filterList(self, data : list):
         print('StudentFilter#filterList')
-        return [subm for subm in data if self.matches(subm.name, subm.mail)[1]]
+        known = dict()
+        result = []
+        
+        for subm in data:
+            key = (subm.name, subm.mail)
+            if key not in known:
+                known[key] = self.matches(subm.name, subm.mail)[1]
+            if known[key]:
+                result.append(subm)
+                
+        return result
     
 #==============================================================================
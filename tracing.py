@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:40:06 2026
+
+Nested timing spans for the submission pipeline (stage -> submission ->
+HTTP request / extraction), exported in the Chrome trace format, which
+chrome://tracing and https://ui.perfetto.dev open directly.
+
+Tracing is off by default and a span is then a shared no-op. It is turned
+on by configure() or configureFromEnv():
+
+    TUTORIAL_TRACE=trace.json   - write all spans into trace.json
+    TUTORIAL_PROFILE=profiles   - cProfile every stage into profiles/<stage>.prof
+                                  (only the thread running the stage)
+    TUTORIAL_TRACEMALLOC=1      - report the peak memory of every stage
+
+@author: ctoffer
+"""
+
+import cProfile
+import json
+import tracemalloc
+
+from os import environ as o_environ
+from os import getpid as o_getpid
+from os import makedirs as o_mkdirs
+from os.path import join as p_join
+from threading import Lock, get_ident
+from time import perf_counter
+
+#==============================================================================
+
+class NullSpan:
+
+    def __enter__ (self):
+        return self
+
+    def __exit__ (self, type, value, traceback):
+        pass
+
+    def set(self, **args):
+        pass
+
+NULL_SPAN = NullSpan()
+
+#------------------------------------------------------------------------------
+
+class Span:
+
+    def __init__(self, tracer, name, cat, args):
+        self.__tracer = tracer
+        self.__name = name
+        self.__cat = cat
+        self.__args = args
+        self.__start = None
+
+    def __enter__ (self):
+        self.__start = perf_counter()
+        return self
+
+    def __exit__ (self, type, value, traceback):
+        if type is not None:
+            self.__args['error'] = '%s: %s' % (type.__name__, value)
+        self.__tracer.record(self.__name, self.__start, perf_counter() - self.__start
+                             , cat = self.__cat, **self.__args)
+
+    def set(self, **args):
+        self.__args.update(args)
+
+#==============================================================================
+
+class Tracer:
+
+    """
+        Collects complete events ('ph' : 'X') of all threads. Times are
+        perf_counter seconds, which share one clock across the processes of
+        a machine, so spans measured in worker processes can be recorded too.
+    """
+    def __init__(self):
+        self.__events = []
+        self.__lock = Lock()
+
+    def span(self, name, cat = '', **args):
+        return Span(self, name, cat, args)
+
+    def record(self, name, start, seconds, cat = '', pid = None, tid = None, **args):
+        event = {'name' : name, 'cat' : cat, 'ph' : 'X'
+                 , 'ts' : start * 1e6, 'dur' : seconds * 1e6
+                 , 'pid' : o_getpid() if pid is None else pid
+                 , 'tid' : get_ident() if tid is None else tid
+                 , 'args' : {k : str(v) for k, v in args.items()}}
+        with self.__lock:
+            self.__events.append(event)
+
+    @property
+    def events(self):
+        with self.__lock:
+            return list(self.__events)
+
+    def save(self, path):
+        with open(path, 'w', encoding = 'utf-8') as fp:
+            json.dump({'traceEvents' : self.events, 'displayTimeUnit' : 'ms'}, fp)
+
+#==============================================================================
+
+TRACER = None
+PROFILE_DIR = None
+MEMORY = False
+TRACE_PATH = None
+
+def configure(trace = None, profile = None, memory = False):
+    """ trace: file for the Chrome trace, profile: folder for the cProfile dumps """
+    global TRACER, PROFILE_DIR, MEMORY, TRACE_PATH
+    TRACE_PATH = trace
+    TRACER = Tracer() if trace is not None else None
+    PROFILE_DIR = profile
+    MEMORY = memory
+
+    if profile is not None:
+        o_mkdirs(profile, exist_ok = True)
+
+def configureFromEnv():
+    configure(trace = o_environ.get('TUTORIAL_TRACE') or None
+              , profile = o_environ.get('TUTORIAL_PROFILE') or None
+              , memory = o_environ.get('TUTORIAL_TRACEMALLOC', '') not in ('', '0'))
+
+def save():
+    if TRACER is not None:
+        TRACER.save(TRACE_PATH)
+        print('Wrote trace to', TRACE_PATH)
+
+#------------------------------------------------------------------------------
+
+def span(name, cat = '', **args):
+    if TRACER is None:
+        return NULL_SPAN
+    return TRACER.span(name, cat, **args)
+
+def record(name, start, seconds, cat = '', **args):
+    if TRACER is not None:
+        TRACER.record(name, start, seconds, cat, **args)
+
+#------------------------------------------------------------------------------
+
+class Stage:
+
+    """
+        A top level span of the pipeline, optionally profiled with cProfile
+        and tracemalloc. Prints the time (and peak memory) when it ends.
+        Stages may overlap in different threads (sbm_dload.py with several
+        sheets), the peak memory is then only reported by the stage which
+        started tracemalloc.
+    """
+    def __init__(self, name, **args):
+        self.__name = name
+        self.__span = span(name, cat = 'stage', **args)
+        self.__profile = None
+        self.__memory = False
+        self.__start = None
+
+    def __enter__ (self):
+        if MEMORY and not tracemalloc.is_tracing():
+            self.__memory = True
+            tracemalloc.start()
+        if PROFILE_DIR is not None:
+            self.__profile = cProfile.Profile()
+            try:
+                self.__profile.enable()
+            except ValueError:
+                # newer Pythons allow only one active profiler
+                self.__profile = None
+
+        self.__start = perf_counter()
+        self.__span.__enter__()
+        return self.__span
+
+    def __exit__ (self, type, value, traceback):
+        seconds = perf_counter() - self.__start
+        summary = 'Stage %s: %.2f s' % (self.__name, seconds)
+
+        if self.__profile is not None:
+            self.__profile.disable()
+            path = p_join(PROFILE_DIR, self.__name + '.prof')
+            self.__profile.dump_stats(path)
+            self.__span.set(profile = path)
+            summary += ', profile in %s' % path
+
+        if self.__memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.__span.set(peakMiB = '%.1f' % (peak / 2 ** 20))
+            summary += ', peak %.1f MiB' % (peak / 2 ** 20)
+
+        self.__span.__exit__(type, value, traceback)
+        print(summary)
+
+def stage(name, **args):
+    return Stage(name, **args)
+
+#==============================================================================
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:25:14 2026
+
+Streaming download engine used by MoodleSubmission.download:
+    TransferReport - bytes, time and latency of one transfer
+    StreamWriter   - writes a streamed response body into a file
+
+@author: ctoffer
+"""
+
+import os
+
+from time import perf_counter
+
+#==============================================================================
+
+class TransferReport:
+
+    def __init__(self, path, offset, nbytes, seconds, firstByte, chunks):
+        self.__path = path
+        self.__offset = offset
+        self.__bytes = nbytes
+        self.__seconds = seconds
+        self.__firstByte = firstByte
+        self.__chunks = chunks
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def offset(self):
+        return self.__offset
+
+    @property
+    def bytes(self):
+        return self.__bytes
+
+    @property
+    def seconds(self):
+        return self.__seconds
+
+    @property
+    def firstByte(self):
+        return self.__firstByte
+
+    @property
+    def chunks(self):
+        return self.__chunks
+
+    @property
+    def throughput(self):
+        """ Bytes per second """
+        return self.__bytes / self.__seconds if self.__seconds > 0 else 0.0
+
+    def __str__(self):
+        return '%.2f MB in %.2f s, %.2f MB/s, first byte after %i ms, %i chunks' \
+                % (self.__bytes / 1e6, self.__seconds, self.throughput / 1e6  \
+                   , self.__firstByte * 1000, self.__chunks)
+
+    #--------------------------------------------------------------------------
+
+    def toDict(self):
+        d = dict()
+        d['Path'] = self.__path
+        d['Offset'] = self.__offset
+        d['Bytes'] = self.__bytes
+        d['Seconds'] = self.__seconds
+        d['FirstByte'] = self.__firstByte
+        d['Chunks'] = self.__chunks
+        return d
+
+#==============================================================================
+
+class StreamWriter:
+
+    """
+        The chunk size starts at minChunk and doubles while the socket
+        delivers full chunks faster than targetTime, it halves when a read
+        takes much longer. So fast transfers end up with few large reads and
+        writes, slow ones stay responsive.
+    """
+    def __init__(self, minChunk = 64 * 1024, maxChunk = 4 * 1024 * 1024   \
+                 , bufferSize = 1024 * 1024, preallocate = False, targetTime = 0.05):
+        self.__minChunk = minChunk
+        self.__maxChunk = maxChunk
+        self.__bufferSize = bufferSize
+        self.__preallocate = preallocate
+        self.__targetTime = targetTime
+
+    #--------------------------------------------------------------------------
+
+    def __chunks(self, response):
+        raw = getattr(response, 'raw', None)
+
+        # without a raw socket stream only fixed sized chunks are possible
+        if raw is None or not hasattr(raw, 'read'):
+            yield from response.iter_content(chunk_size = self.__maxChunk)
+            return
+
+        size = self.__minChunk
+        while True:
+            start = perf_counter()
+            chunk = raw.read(size, decode_content = True)
+            if not chunk:
+                return
+
+            yield chunk
+            took = perf_counter() - start
+
+            if len(chunk) == size and took < self.__targetTime:
+                size = min(2 * size, self.__maxChunk)
+            elif took > 4 * self.__targetTime:
+                size = max(size // 2, self.__minChunk)
+
+    def write(self, response, path, offset = 0, total = None):
+        """
+            Writes the body of response into path starting at offset.
+            total is the expected size of the complete file, if known.
+        """
+        start = perf_counter()
+        firstByte, written, chunks = None, 0, 0
+        mode = 'r+b' if offset > 0 else 'wb'
+
+        with open(path, mode, buffering = self.__bufferSize) as f:
+            f.seek(offset)
+
+            if self.__preallocate and total is not None and total > offset \
+                    and hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(f.fileno(), offset, total - offset)
+                except OSError:
+                    pass
+
+            try:
+                for chunk in self.__chunks(response):
+                    if firstByte is None:
+                        firstByte = perf_counter() - start
+                    f.write(chunk)
+                    written += len(chunk)
+                    chunks += 1
+            finally:
+                # drop the preallocated tail, the file size is the resume offset
+                f.truncate(offset + written)
+
+        seconds = perf_counter() - start
+        elapsed = getattr(response, 'elapsed', None)
+        latency = 0.0 if elapsed is None else elapsed.total_seconds()
+        latency += seconds if firstByte is None else firstByte
+
+        return TransferReport(path, offset, written, seconds, latency, chunks)
+
+#==============================================================================
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:12:27 2026
+
+The requests Session used by Moodle, Muesli and the submission downloads.
+
+Every request gets a timeout. Idempotent requests are retried on
+connection errors, timeouts and 429/502/503/504 with jittered exponential
+backoff. GET, HEAD and OPTIONS are idempotent, a POST only if the caller
+says so with idempotent = True, like the POSTs the scrapers read pages
+with. All copies of a Transport share one RetryBudget, so a dead server
+costs a bounded number of retries instead of retries * requests, and one
+RequestMetrics, which records every attempt.
+
+@author: ctoffer
+"""
+
+import requests
+
+from random import uniform
+from threading import Lock
+from time import perf_counter, sleep
+
+from requests.adapters import HTTPAdapter
+
+from metrics import RequestMetrics
+import tracing
+
+#==============================================================================
+
+TIMEOUT = (10, 60)           # seconds to connect, seconds between two reads
+RETRIES = 4
+BACKOFF = 0.5                # seconds, doubled with every attempt
+BACKOFF_MAX = 30
+POOL_SIZE = 10
+RETRY_STATUS = {429, 502, 503, 504}
+
+#------------------------------------------------------------------------------
+
+class RetryBudget:
+
+    """
+        Allows minimum retries plus ratio retries per request, shared by all
+        threads using it.
+    """
+    def __init__(self, ratio = 0.2, minimum = 10):
+        self.__ratio = ratio
+        self.__minimum = minimum
+        self.__requests = 0
+        self.__retries = 0
+        self.__lock = Lock()
+
+    def request(self):
+        with self.__lock:
+            self.__requests += 1
+
+    def withdraw(self):
+        """ True if one more retry is allowed """
+        with self.__lock:
+            if self.__retries >= self.__minimum + self.__ratio * self.__requests:
+                return False
+            self.__retries += 1
+            return True
+
+    @property
+    def stats(self):
+        with self.__lock:
+            return (self.__requests, self.__retries)
+
+#==============================================================================
+
+class Transport(requests.Session):
+
+    def __init__(self, timeout = TIMEOUT, retries = RETRIES, backoff = BACKOFF
+                 , poolSize = POOL_SIZE, budget = None, metrics = None):
+        super().__init__()
+        self.__timeout = timeout
+        self.__retries = retries
+        self.__backoff = backoff
+        self.__poolSize = poolSize
+        self.__budget = budget or RetryBudget()
+        self.__metrics = metrics or RequestMetrics()
+
+        adapter = HTTPAdapter(pool_connections = poolSize, pool_maxsize = poolSize)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    @property
+    def budget(self):
+        return self.__budget
+
+    @property
+    def metrics(self):
+        return self.__metrics
+
+    def clone(self):
+        """ A new Transport with the same settings, retry budget and metrics, see SessionPool """
+        return Transport(self.__timeout, self.__retries, self.__backoff, self.__poolSize
+                         , self.__budget, self.__metrics)
+
+    #--------------------------------------------------------------------------
+
+    def retryDelay(self, attempt, response = None):
+        """
+            Seconds to wait before retry number attempt (counted from 0) or
+            None if no retry is left.
+        """
+        if attempt >= self.__retries or not self.__budget.withdraw():
+            return None
+
+        retryAfter = None if response is None else response.headers.get('Retry-After')
+        if retryAfter is not None and retryAfter.isdigit():
+            return min(int(retryAfter), BACKOFF_MAX)
+
+        # full jitter, so the workers do not retry in lockstep
+        return uniform(0, min(BACKOFF_MAX, self.__backoff * 2 ** attempt))
+
+    @staticmethod
+    def idempotent(method):
+        return method.upper() in ('GET', 'HEAD', 'OPTIONS')
+
+    @staticmethod
+    def bytesOf(r, stream):
+        # a streamed body is not read yet, trust the header
+        length = r.headers.get('Content-Length')
+        if length is not None and length.isdigit():
+            return int(length)
+        return 0 if stream else len(r.content)
+
+    def request(self, method, url, idempotent = None, **kwargs):
+        """ idempotent = None decides by the method, logins and logouts must never be retried """
+        kwargs.setdefault('timeout', self.__timeout)
+        retry = Transport.idempotent(method) if idempotent is None else idempotent
+        self.__budget.request()
+
+        attempt = 0
+        while True:
+            start = perf_counter()
+            try:
+                with tracing.span('HTTP ' + method, cat = 'http', url = url, attempt = attempt) as span:
+                    r = super().request(method, url, **kwargs)
+                    span.set(status = r.status_code)
+            except requests.exceptions.RequestException as e:
+                self.__metrics.record(method, url, type(e).__name__, 0, perf_counter() - start)
+                if not isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+                    raise
+                delay = self.retryDelay(attempt) if retry else None
+                if delay is None:
+                    raise
+                print('Retry %s %s in %.1f s - %s' % (method, url, delay, type(e).__name__))
+            else:
+                self.__metrics.record(method, url, r.status_code, Transport.bytesOf(r, kwargs.get('stream'))
+                                      , perf_counter() - start)
+                if r.status_code not in RETRY_STATUS or not retry:
+                    return r
+                delay = self.retryDelay(attempt, r)
+                if delay is None:
+                    return r
+                r.close()
+                print('Retry %s %s in %.1f s - HTTP %i' % (method, url, delay, r.status_code))
+
+            sleep(delay)
+            attempt += 1
+
+#==============================================================================
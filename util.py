@@ -7,6 +7,17 @@ Created on Mon Oct 30 13:09:17 2017
 """
 
 import sys
+import json
+
+from os import replace as o_replace
+from os import stat as o_stat
+from os.path import exists as p_exists
+from mmap import mmap, ACCESS_READ
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import local, Lock
+from importlib import import_module
+from importlib.util import find_spec
 
 """
     +====+==========+
@@ -25,58 +36,297 @@ class DataTable:
     """
     def __init__(self, header : list, data, to_dict = lambda x : x):
         self.__header = header
-        self.__data   = list(map(to_dict, data))
+        self.__widths = [len(colName) for colName in header]
+        self.__data = []
         
-    def __findMax(self, ind):
-        
-        maxs = [len(colName) for colName in self.__header]
+        # the column widths are collected while the rows are converted
+        for row in map(to_dict, data):
+            self.__data.append(row)
+            growWidths(self.__widths, header, row)
+    
+    @property
+    def widths(self):
+        return list(self.__widths)
         
+    def printToStream(self, stream = sys.stdout):
+        writer = DataTableWriter(stream, self.__header, self.__widths)
         for row in self.__data:
-            for key in self.__header:
-                if maxs[ind[key]] < len(row[key]):
-                    maxs[ind[key]] = len(row[key])
+            writer.writeRow(row)
+    
+    #--------------------------------------------------------------------------
+    
+    @staticmethod
+    def __iterRows(lines, from_dict):
+        # every odd line is a row, the first one holds the column names
+        keys = None
+        toCols = lambda row : [s.strip() for s in row.split('|')]
         
-        return maxs
+        for i, line in enumerate(lines):
+            if i % 2 == 0:
+                continue
+            
+            if keys is None:
+                keys = toCols(line.rstrip('\n'))
+                continue
+            
+            row = {k : v for k, v in zip(keys, toCols(line.rstrip('\n'))) if k != ''}
+            if len(row) > 0:
+                yield from_dict(row)
+            
+    @staticmethod
+    def readFromString(table : str, from_dict = lambda x : x):
+        return list(DataTable.__iterRows(table.split('\n'), from_dict))
+    
+    @staticmethod
+    def iterFromFile(fname, from_dict = lambda x : x):
+        """ Yields the rows one by one, the file is never read as a whole. """
+        with open(fname, 'r', encoding = 'utf-8') as fp:
+            yield from DataTable.__iterRows(fp, from_dict)
         
-    def printToStream(self, stream = sys.stdout):
-        ind = {colName : i for i, colName in enumerate(self.__header)}
-        print(ind)
-        maxs = self.__findMax(ind)
-        print(maxs)
+    @staticmethod
+    def readFromFile(fname, from_dict = lambda x : x):
+        return list(DataTable.iterFromFile(fname, from_dict))
+    
+    #--------------------------------------------------------------------------
+    
+    @staticmethod
+    def __realign(fname, header, widths):
+        # the second pass reads the rows back, data may have been a generator
+        tmpName = fname + '.tmp'
+        with open(tmpName, 'w', encoding = 'utf-8') as fp:
+            writer = DataTableWriter(fp, header, widths)
+            for row in DataTable.iterFromFile(fname):
+                writer.writeRow(row)
+        o_replace(tmpName, fname)
         
-        pad = lambda s, p = ' ' : p + s + p
+    @staticmethod
+    def writeToFile(fname, header : list, data, to_dict = lambda x : x, widths = None):
+        """
+            Streams data into fname without holding it in memory.
+            The column widths are taken from widths if given (fixed-width),
+            otherwise from the sidecar <fname>.widths of the last write. If a
+            value is longer than its column, the written file is realigned
+            once from disk with the grown widths, which are stored in the
+            sidecar so the next write fits in one pass.
+        """
+        sidecar = fname + '.widths'
+        if widths is None:
+            widths = [len(colName) for colName in header]
+            if p_exists(sidecar):
+                with open(sidecar, 'r', encoding = 'utf-8') as fp:
+                    stored = json.load(fp)
+                widths = [max(w, stored.get(k, 0)) for k, w in zip(header, widths)]
         
-        div  = pad('+'.join([(v + 2) * '-' for v in maxs]), '+') + '\n'
-        hDiv = pad('+'.join([(v + 2) * '=' for v in maxs]), '+') + '\n'
+        seen = [len(colName) for colName in header]
+        with open(fname, 'w', encoding = 'utf-8') as fp:
+            writer = DataTableWriter(fp, header, widths)
+            for row in map(to_dict, data):
+                writer.writeRow(row)
+                growWidths(seen, header, row)
         
-        trafo = lambda row : sorted(row.items(), key = lambda t : ind[t[0]])
-        rjust = lambda k,v : pad(v.rjust(maxs[ind[k]]))
-        norm  = lambda row : [rjust(k,v) for k,v in trafo(row)]
-        toRow = lambda row : pad('|'.join(norm(row)), '|') + '\n'
+        if any(s > w for s, w in zip(seen, widths)):
+            DataTable.__realign(fname, header, [max(s, w) for s, w in zip(seen, widths)])
+        
+        with open(sidecar, 'w', encoding = 'utf-8') as fp:
+            json.dump({k : w for k, w in zip(header, seen)}, fp)
+
+#------------------------------------------------------------------------------
+
+def growWidths(widths, header, row):
+    for i, key in enumerate(header):
+        if widths[i] < len(row[key]):
+            widths[i] = len(row[key])
+
+class DataTableWriter:
+    
+    """
+        Writes the table header on creation and then one row per writeRow,
+        every column is right justified to its width.
+    """
+    def __init__(self, stream, header : list, widths : list):
+        self.__stream = stream
+        self.__header = header
+        self.__widths = widths
+        
+        pad = lambda s, p = ' ' : p + s + p
+        self.__div  = pad('+'.join([(v + 2) * '-' for v in widths]), '+') + '\n'
+        hDiv = pad('+'.join([(v + 2) * '=' for v in widths]), '+') + '\n'
         
         stream.write(hDiv)
-        stream.write(toRow({v : v for v in self.__header}))
+        self.__write(header)
         stream.write(hDiv)
         
-        for row in self.__data:
-            stream.write(toRow(row))
-            stream.write(div)
-            
-    @staticmethod
-    def readFromString(table : str, from_dict = lambda x : x):
-        rows = [v for i, v in enumerate(table.split('\n')) if i % 2 == 1]
-        toCols = lambda row : [s.strip() for s in row.split('|')]
-        keys = toCols(rows[0])
+    def __write(self, values):
+        self.__stream.write(formatRow(values, self.__widths) + '\n')
         
-        grid = [{k : v for k, v in zip(keys, toCols(row)) if k != ''} for row in rows[1:]]
-        grid = filter(lambda x : len(x) > 0, grid)
+    def writeRow(self, row : dict):
+        self.__write([row[key] for key in self.__header])
+        self.__stream.write(self.__div)
         
-        return list(map(from_dict, grid))
+def formatRow(values, widths):
+    cells = [' ' + v.rjust(w) + ' ' for v, w in zip(values, widths)]
+    return '|' + '|'.join(cells) + '|'
+
+#------------------------------------------------------------------------------
+
+class IndexedTable:
+    
+    """
+        Random access to the rows of a .table file by the value of a key
+        column. The byte offset of every row is kept in the sidecar
+        <fname>.idx, which is rebuilt whenever the table changed behind its
+        back. Rows are read from a memory map of the file.
         
-    @staticmethod
-    def readFromFile(fname, from_dict = lambda x : x):
-        with open(fname, 'r', encoding = 'utf-8') as fp:
-            return DataTable.readFromString(fp.read(), from_dict = from_dict)
+        update and append change the file in place as long as the new row
+        has the same encoded length (update) or fits the column widths
+        (append); otherwise the table is rewritten once.
+        
+        The memory map stays open between reads and is only renewed when the
+        file changed, close() (or the with statement) releases it.
+    """
+    def __init__(self, fname, key):
+        self.__fname = fname
+        self.__key = key
+        self.__sidecar = fname + '.idx'
+        self.__index = None
+        self.__fp = None
+        self.__mm = None
+        self.__mapped = None
+        
+    def __enter__ (self):
+        return self
+    
+    def __exit__ (self, type, value, traceback):
+        self.close()
+        
+    def close(self):
+        if self.__mm is not None:
+            self.__mm.close()
+            self.__fp.close()
+        self.__fp, self.__mm, self.__mapped = None, None, None
+        
+    #--------------------------------------------------------------------------
+    
+    def __stamp(self):
+        stat = o_stat(self.__fname)
+        return [stat.st_mtime_ns, stat.st_size]
+    
+    def __saveIndex(self):
+        self.__index['Stamp'] = self.__stamp()
+        with open(self.__sidecar, 'w', encoding = 'utf-8') as fp:
+            json.dump(self.__index, fp)
+    
+    def __build(self):
+        index = {'Key' : self.__key, 'Header' : None, 'Widths' : None, 'Rows' : dict()}
+        offset = 0
+        
+        with open(self.__fname, 'rb') as fp:
+            for i, line in enumerate(fp):
+                text = line.decode('utf-8').rstrip('\r\n')
+                
+                if i == 0:
+                    index['Widths'] = [len(cell) - 2 for cell in text.split('+')[1:-1]]
+                elif i == 1:
+                    index['Header'] = [cell.strip() for cell in text.split('|')[1:-1]]
+                elif i % 2 == 1:
+                    cells = [cell.strip() for cell in text.split('|')[1:-1]]
+                    row = dict(zip(index['Header'], cells))
+                    if self.__key in row:
+                        index['Rows'].setdefault(row[self.__key], offset)
+                    
+                offset += len(line)
+        
+        self.__index = index
+        self.__saveIndex()
+    
+    def __load(self):
+        if self.__index is not None and self.__index['Stamp'] == self.__stamp():
+            return self.__index
+        
+        if p_exists(self.__sidecar):
+            with open(self.__sidecar, 'r', encoding = 'utf-8') as fp:
+                index = json.load(fp)
+            if index.get('Key') == self.__key and index.get('Stamp') == self.__stamp():
+                self.__index = index
+                return index
+        
+        self.__build()
+        return self.__index
+    
+    #--------------------------------------------------------------------------
+    
+    def keys(self):
+        return list(self.__load()['Rows'].keys())
+    
+    def __map(self):
+        stamp = self.__stamp()
+        if self.__mm is None or self.__mapped != stamp:
+            self.close()
+            self.__fp = open(self.__fname, 'rb')
+            self.__mm = mmap(self.__fp.fileno(), 0, access = ACCESS_READ)
+            self.__mapped = stamp
+        return self.__mm
+    
+    def __readLine(self, offset):
+        mm = self.__map()
+        end = mm.find(b'\n', offset)
+        line = mm[offset : len(mm) if end < 0 else end]
+        return line.decode('utf-8').rstrip('\r')
+    
+    def get(self, key, from_dict = lambda x : x):
+        """ The first row with the given key or None """
+        index = self.__load()
+        offset = index['Rows'].get(key)
+        if offset is None:
+            return None
+        
+        cells = [cell.strip() for cell in self.__readLine(offset).split('|')[1:-1]]
+        return from_dict(dict(zip(index['Header'], cells)))
+    
+    #--------------------------------------------------------------------------
+    
+    def __rewrite(self, rows):
+        # truncating a mapped file is undefined, drop the map first
+        self.close()
+        with open(self.__fname, 'w', encoding = 'utf-8') as fp:
+            DataTable(self.__index['Header'], rows).printToStream(stream = fp)
+        self.__build()
+    
+    def update(self, key, row : dict):
+        index = self.__load()
+        offset = index['Rows'].get(key)
+        if offset is None:
+            raise KeyError(key)
+        
+        old = self.__readLine(offset).encode('utf-8')
+        new = formatRow([row[k] for k in index['Header']], index['Widths']).encode('utf-8')
+        
+        if len(new) != len(old) or row[self.__key] != key:
+            rows = DataTable.readFromFile(self.__fname)
+            pos = [r[self.__key] for r in rows].index(key)
+            self.__rewrite(rows[:pos] + [row] + rows[pos + 1:])
+            return
+        
+        with open(self.__fname, 'r+b') as fp:
+            fp.seek(offset)
+            fp.write(new)
+        self.__saveIndex()
+    
+    def append(self, row : dict):
+        index = self.__load()
+        values = [row[k] for k in index['Header']]
+        
+        if any(len(v) > w for v, w in zip(values, index['Widths'])):
+            self.__rewrite(DataTable.readFromFile(self.__fname) + [row])
+            return
+        
+        div = '+' + '+'.join([(w + 2) * '-' for w in index['Widths']]) + '+'
+        with open(self.__fname, 'ab') as fp:
+            offset = fp.tell()
+            fp.write((formatRow(values, index['Widths']) + '\n' + div + '\n').encode('utf-8'))
+            
+        index['Rows'].setdefault(row[self.__key], offset)
+        self.__saveIndex()
       
 #==============================================================================
     
@@ -150,4 +400,108 @@ class ListChoice:
         else:
             return self.__list[index]
         
-#==============================================================================
\ No newline at end of file
+#==============================================================================
+
+class SessionPool:
+    
+    """
+        Hands out one copy of a logged in session per worker thread.
+        Every copy shares the cookies and headers of the original session
+        but keeps its own connection pool, so the connections of a worker
+        are reused for all of its requests.
+    """
+    def __init__(self, session):
+        self.__session = session
+        self.__local = local()
+        self.__lock = Lock()
+        self.__clones = []
+        
+    #--------------------------------------------------------------------------
+    
+    def __enter__ (self):
+        return self
+    
+    def __exit__ (self, type, value, traceback):
+        self.close()
+    
+    #--------------------------------------------------------------------------
+    
+    def get(self):
+        clone = getattr(self.__local, 'session', None)
+        
+        if clone is None:
+            # a Transport copies its timeouts, retries and retry budget
+            clone = self.__session.clone() if hasattr(self.__session, 'clone') else type(self.__session)()
+            clone.headers.update(self.__session.headers)
+            clone.cookies.update(self.__session.cookies)
+            self.__local.session = clone
+            
+            with self.__lock:
+                self.__clones.append(clone)
+                
+        return clone
+    
+    def close(self):
+        with self.__lock:
+            for clone in self.__clones:
+                clone.close()
+            self.__clones = []
+            
+#------------------------------------------------------------------------------
+
+def parallelMap(fn, items, workers = 4):
+    """
+        Applies fn to every item on a bounded pool of worker threads.
+        Returns a list of (item, result, error) in the order of items, where
+        error is None on success and the raised exception otherwise.
+    """
+    def call(item):
+        try:
+            return (item, fn(item), None)
+        except Exception as e:
+            return (item, None, e)
+        
+    if workers <= 1:
+        return [call(item) for item in items]
+    
+    with ThreadPoolExecutor(max_workers = workers) as pool:
+        futures = [pool.submit(call, item) for item in items]
+        return [future.result() for future in futures]
+
+#==============================================================================
+
+class LazyModule:
+    
+    """
+        Stands in for a module until the first attribute access imports it.
+        import_module holds the import lock of the module, so threads which
+        touch it for the first time at once all get the fully loaded module
+        (importlib's LazyLoader hands out a half loaded one).
+    """
+    def __init__(self, name):
+        self.__name = name
+        self.__module = None
+        
+    def __getattr__(self, name):
+        if self.__module is None:
+            self.__module = import_module(self.__name)
+        return getattr(self.__module, name)
+    
+    def __repr__(self):
+        return '<lazy module %r>' % self.__name
+
+def lazyImport(name):
+    """
+        Returns the module name, which is imported on its first attribute
+        access. Keeps heavy dependencies (requests, bs4, rarfile) out of the
+        startup of commands which never use them.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    
+    if find_spec(name) is None:
+        raise ModuleNotFoundError('No module named %r' % name, name = name)
+    
+    return LazyModule(name)
+
+#==============================================================================